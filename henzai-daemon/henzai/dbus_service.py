@@ -5,19 +5,42 @@ and the Python daemon.
 """
 
 import logging
+import re
+import subprocess
+import threading
+import time
 from dasbus.connection import SessionMessageBus
 from dasbus.server.interface import dbus_interface, dbus_signal
 from dasbus.typing import Str
 import json
-from gi.repository import GLib
+from gi.repository import Gio, GLib
 from .tools import ToolExecutor
 
+try:
+    import orjson
+    
+    def _json_dumps(obj) -> str:
+        # D-Bus replies are strings, so decode orjson's bytes
+        return orjson.dumps(obj).decode('utf-8')
+except ImportError:  # orjson is optional, fall back to stdlib
+    _json_dumps = json.dumps
+
 logger = logging.getLogger(__name__)
 
 # D-Bus service information
 SERVICE_NAME = "org.gnome.henzai"
 OBJECT_PATH = "/org/gnome/henzai"
 
+# Tool call markup in LLM responses: <tool_call>JSON</tool_call>
+_TOOL_CALL_RE = re.compile(r'<tool_call>(.*?)</tool_call>', re.DOTALL)
+
+# Maximum streamed deltas coalesced into one ResponseChunk/ThinkingChunk signal
+STREAM_BATCH_SIZE = 32
+
+# Milliseconds queued chunks wait on the main loop before being emitted
+# together (0 emits on the next idle iteration)
+CHUNK_FLUSH_MS = 20
+
 
 @dbus_interface(SERVICE_NAME)
 class henzaiService:
@@ -35,13 +58,28 @@ class henzaiService:
         self.memory = memory_store
         self.tool_executor = ToolExecutor()
         self.status = "initializing"
-        self._stop_generation = False  # Flag for stopping generation
+        self._stop_generation = threading.Event()  # Set by StopGeneration
         self._current_generation_id = None  # Track current generation
         
+        # Streamed chunks waiting to be emitted from the main loop, as
+        # [signal name, generation id, text pieces] in arrival order
+        self._pending_chunks = []
+        self._chunk_lock = threading.Lock()
+        self._flush_source_id = 0
+        
         # Cache for Ramalama status checks to reduce HTTP overhead
         self._ramalama_status_cache = None
         self._ramalama_status_cache_time = 0
         self._ramalama_status_cache_ttl = 2.0  # Cache for 2 seconds
+        self._ramalama_status_lock = threading.Lock()
+        self._ramalama_status_thread = None
+        # Bumped on invalidation so an in-flight probe can't store a stale result
+        self._ramalama_status_generation = 0
+        # Status reported instead of the probe after a failed SetModel restart,
+        # until a later probe finds Ramalama ready again
+        self._model_change_error = None
+        # Status reported while SetModel's reload/restart is in flight
+        self._model_change_pending = None
         
         # Register the service on D-Bus
         self.bus = SessionMessageBus()
@@ -117,6 +155,12 @@ class henzaiService:
         """
         Get the current status of the daemon and Ramalama.
         
+        The Ramalama probe (systemctl plus a /health request) can take
+        seconds, so it never runs on the reply path once a result is
+        cached: a stale cache is returned as-is while a background
+        thread refreshes it. Only the first call (or the first after
+        SetModel) probes inline.
+        
         Returns:
             JSON string with:
             - daemon_status: "ready", "thinking", "error"
@@ -124,22 +168,75 @@ class henzaiService:
             - ramalama_message: Human-readable status message
             - ready: Boolean indicating if system is ready
         """
-        import requests
-        import time
-        import subprocess
+        cached_status = self._ramalama_status_cache
+        if cached_status is None:
+            cached_status = self._refresh_ramalama_status()
+        elif time.time() - self._ramalama_status_cache_time >= self._ramalama_status_cache_ttl:
+            self._prefetch_ramalama_status()
+        
+        # The old model may still be serving while a switch is pending or
+        # after it failed; don't let the probe make that look like success
+        if self._model_change_error is not None:
+            cached_status = self._model_change_error
+        elif self._model_change_pending is not None:
+            cached_status = self._model_change_pending
+        
+        # Build status response
+        status_data = {
+            "daemon_status": self.status,
+            "ramalama_status": cached_status["ramalama_status"],
+            "ramalama_message": cached_status["ramalama_message"],
+            "ready": self.status == "ready" and cached_status["ramalama_status"] == "ready"
+        }
+        return _json_dumps(status_data)
+    
+    def _prefetch_ramalama_status(self):
+        """Refresh the Ramalama status cache in a background thread."""
+        with self._ramalama_status_lock:
+            if self._ramalama_status_thread is not None and self._ramalama_status_thread.is_alive():
+                return  # Refresh already in flight
+            self._ramalama_status_thread = threading.Thread(
+                target=self._refresh_ramalama_status, daemon=True
+            )
+            self._ramalama_status_thread.start()
+    
+    def _refresh_ramalama_status(self) -> dict:
+        """
+        Probe Ramalama and store the result in the status cache.
         
-        # Check cache first to avoid excessive HTTP requests
+        Returns:
+            Dict with ramalama_status and ramalama_message
+        """
+        with self._ramalama_status_lock:
+            generation = self._ramalama_status_generation
         current_time = time.time()
-        if (self._ramalama_status_cache is not None and 
-            current_time - self._ramalama_status_cache_time < self._ramalama_status_cache_ttl):
-            # Return cached status
-            cached_status = self._ramalama_status_cache.copy()
-            cached_status["daemon_status"] = self.status
-            cached_status["ready"] = self.status == "ready" and cached_status["ramalama_status"] == "ready"
-            import json
-            return json.dumps(cached_status)
-        
-        # Check Ramalama availability (not cached or cache expired)
+        status = self._probe_ramalama_status()
+        with self._ramalama_status_lock:
+            # Drop the result if the cache was invalidated while probing
+            if generation == self._ramalama_status_generation:
+                self._ramalama_status_cache = status
+                self._ramalama_status_cache_time = current_time
+                if status["ramalama_status"] == "ready" and self._model_change_pending is None:
+                    # Ramalama recovered since the failed switch was reported
+                    self._model_change_error = None
+        return status
+    
+    def _invalidate_ramalama_status(self):
+        """Discard the cached Ramalama status and any probe still in flight."""
+        with self._ramalama_status_lock:
+            self._ramalama_status_generation += 1
+            self._ramalama_status_cache = None
+            self._ramalama_status_cache_time = 0
+    
+    def _probe_ramalama_status(self) -> dict:
+        """
+        Check the Ramalama systemd service and its /health endpoint.
+        
+        Returns:
+            Dict with ramalama_status and ramalama_message
+        """
+        import requests
+        
         ramalama_status = "unavailable"
         ramalama_message = ""
         
@@ -174,10 +271,8 @@ class henzaiService:
                 # Service is active, check if API is ready
                 try:
                     # Check /health endpoint (using 127.0.0.1 to avoid IPv6 issues with pasta)
-                    health_response = requests.get(
-                        f"{self.llm.api_url}/health",
-                        timeout=2
-                    )
+                    # Goes through the LLM client's pooled session (keeps the socket warm)
+                    health_response = self.llm.get_health(timeout=2)
                     if health_response.status_code == 200 and health_response.json().get('status') == 'ok':
                         # Health OK - model is loaded and ready
                         ramalama_status = "ready"
@@ -206,28 +301,17 @@ class henzaiService:
             ramalama_status = "error"
             ramalama_message = f"System error: {str(e)}"
         
-        # Cache the ramalama status portion
-        self._ramalama_status_cache = {
+        return {
             "ramalama_status": ramalama_status,
             "ramalama_message": ramalama_message
         }
-        self._ramalama_status_cache_time = current_time
-        
-        # Build status response
-        status_data = {
-            "daemon_status": self.status,
-            "ramalama_status": ramalama_status,
-            "ramalama_message": ramalama_message,
-            "ready": self.status == "ready" and ramalama_status == "ready"
-        }
-        
-        import json
-        return json.dumps(status_data)
     
     def ClearHistory(self) -> None:
         """Clear conversation history."""
         try:
             self.memory.clear_history()
+            # Asking again in a fresh conversation should get a fresh answer
+            self.llm.clear_response_cache()
             logger.info("Conversation history cleared")
             # Emit signal to notify UI
             def emit():
@@ -253,6 +337,8 @@ class henzaiService:
             # Note: This clears all history. In future, could save current conversation
             # and start fresh without losing old chats
             self.memory.clear_history()
+            # Asking again in a fresh conversation should get a fresh answer
+            self.llm.clear_response_cache()
             logger.info("Started new conversation")
             # Emit signal to notify UI
             def emit():
@@ -279,10 +365,10 @@ class henzaiService:
             logger.info("ListModels called")
             models = self.llm.list_available_models()
             logger.info(f"Returning {len(models)} models")
-            return json.dumps(models)
+            return _json_dumps(models)
         except Exception as e:
             logger.error(f"Error listing models: {e}", exc_info=True)
-            return json.dumps([])
+            return _json_dumps([])
     
     def SetModel(self, model_id: str) -> str:
         """
@@ -300,10 +386,11 @@ class henzaiService:
             Status message
         """
         try:
-            import subprocess
             import os
             
+            self._model_change_error = None
             old_model = self.llm.model
+            old_reasoning = self.llm.reasoning_enabled
             self.llm.model = model_id
             logger.info(f"Model change requested: {old_model} → {model_id}")
             
@@ -347,58 +434,148 @@ class henzaiService:
                 service_content
             )
             
-            # Write updated service file
-            with open(service_file, 'w') as f:
-                f.write(new_content)
+            # Only touch the unit (and systemd) when the model actually differs
+            unit_changed = new_content != service_content
+            if unit_changed:
+                # Write updated service file
+                with open(service_file, 'w') as f:
+                    f.write(new_content)
+                
+                logger.info(f"Updated service file with model: {model_spec}")
+            else:
+                logger.info(f"Service file already uses model: {model_spec}")
             
-            logger.info(f"Updated service file with model: {model_spec}")
+            if not unit_changed and model_spec not in service_content:
+                # The regex found no model to replace; nothing was switched
+                logger.error(f"Could not find the model in the ExecStart line of {service_file}")
+                self.llm.model = old_model
+                self.llm.reasoning_enabled = old_reasoning
+                return f"Error: could not update the model in {service_file}. Please edit its ExecStart line manually."
             
-            # Reload systemd and restart ramalama
-            try:
-                # Reload systemd daemon
-                subprocess.run(
-                    ['systemctl', '--user', 'daemon-reload'],
-                    check=True,
-                    capture_output=True,
-                    timeout=10
-                )
-                
-                # Restart ramalama service
-                subprocess.run(
-                    ['systemctl', '--user', 'restart', 'ramalama'],
-                    check=True,
-                    capture_output=True,
-                    timeout=10
-                )
-                
+            # Restart ramalama, unless it is already serving this model
+            if not unit_changed and self._is_ramalama_active():
+                logger.info(f"Ramalama already serving {model_id}, skipping restart")
+                self._emit_model_changed(model_id)
+                return f"Model {model_id} is already active"
+            
+            # Reload systemd and restart ramalama without blocking the main loop;
+            # ModelChanged is emitted once the restart has gone through, and a
+            # failure is reported through GetStatus, which the UI polls after
+            # switching models
+            def on_restarted(success, error):
+                if not success:
+                    self._report_model_change_failure(model_id, "restart", error)
+                    return
                 logger.info(f"Ramalama service restarted with model: {model_id}")
                 
                 # Invalidate status cache to force fresh check
-                self._ramalama_status_cache = None
-                self._ramalama_status_cache_time = 0
+                self._model_change_pending = None
+                self._invalidate_ramalama_status()
                 
-                # Emit signal to notify UI
-                def emit():
-                    try:
-                        self.ModelChanged(model_id)
-                        logger.info(f"ModelChanged signal emitted: {model_id}")
-                    except Exception as e:
-                        logger.error(f"Error emitting ModelChanged: {e}", exc_info=True)
-                    return False
-                GLib.idle_add(emit)
-                return f"Model changed to {model_id} and Ramalama restarted successfully"
-                
-            except subprocess.TimeoutExpired:
-                logger.error("Timeout while restarting Ramalama")
-                return f"Model updated but restart timed out. Check: systemctl --user status ramalama"
-            except subprocess.CalledProcessError as e:
-                logger.error(f"Error restarting Ramalama: {e.stderr}")
-                return f"Model updated but restart failed: {e.stderr.decode()}"
+                self._emit_model_changed(model_id)
+            
+            def on_reloaded(success, error):
+                if not success:
+                    self._report_model_change_failure(model_id, "daemon-reload", error)
+                    return
+                self._run_systemctl_async(['restart', 'ramalama'], on_restarted)
+            
+            # Report the restart right away: the cached status still describes
+            # the old model, and the UI stops polling once it reads "ready"
+            self._model_change_pending = {
+                "ramalama_status": "loading",
+                "ramalama_message": f"Restarting Ramalama with {model_id}..."
+            }
+            self._invalidate_ramalama_status()
+            
+            if unit_changed:
+                self._run_systemctl_async(['daemon-reload'], on_reloaded)
+            else:
+                on_reloaded(True, None)
+            
+            return f"Model changed to {model_id}, restarting Ramalama..."
                 
         except Exception as e:
             logger.error(f"Error setting model: {e}", exc_info=True)
             return f"Error: {str(e)}"
     
+    def _emit_model_changed(self, model_id: str):
+        """Emit the ModelChanged signal from the main loop."""
+        def emit():
+            try:
+                self.ModelChanged(model_id)
+                logger.info(f"ModelChanged signal emitted: {model_id}")
+            except Exception as e:
+                logger.error(f"Error emitting ModelChanged: {e}", exc_info=True)
+            return False
+        GLib.idle_add(emit)
+    
+    def _run_systemctl_async(self, args: list, callback):
+        """
+        Run `systemctl --user` asynchronously via Gio.Subprocess.
+        
+        The main loop keeps dispatching D-Bus calls while systemctl runs.
+        
+        Args:
+            args: Arguments after `systemctl --user` (e.g., ['restart', 'ramalama'])
+            callback: Called on the main loop as callback(success, error_text)
+        """
+        argv = ['systemctl', '--user'] + args
+        try:
+            proc = Gio.Subprocess.new(
+                argv,
+                Gio.SubprocessFlags.STDOUT_PIPE | Gio.SubprocessFlags.STDERR_PIPE
+            )
+        except GLib.Error as e:
+            callback(False, e.message)
+            return
+        
+        def on_finished(proc, result):
+            try:
+                _, _, stderr = proc.communicate_utf8_finish(result)
+                callback(proc.get_successful(), stderr)
+            except GLib.Error as e:
+                callback(False, e.message)
+        
+        proc.communicate_utf8_async(None, None, on_finished)
+    
+    def _report_model_change_failure(self, model_id: str, step: str, error: str):
+        """
+        Record a failed SetModel so GetStatus reports it as an error.
+        
+        Args:
+            model_id: Model that was being switched to
+            step: systemctl command that failed
+            error: systemctl stderr output
+        """
+        logger.error(f"Error switching to {model_id}: systemctl {step} failed: {error}")
+        self._model_change_error = {
+            "ramalama_status": "error",
+            "ramalama_message": f"Failed to switch to {model_id}: systemctl {step} failed: {(error or '').strip()}"
+        }
+        self._model_change_pending = None
+        # Only probes started after the failure may clear the error
+        self._invalidate_ramalama_status()
+    
+    def _is_ramalama_active(self) -> bool:
+        """
+        Check whether the Ramalama systemd service is currently active.
+        
+        Returns:
+            True if `systemctl --user is-active ramalama.service` reports active
+        """
+        try:
+            result = subprocess.run(
+                ['systemctl', '--user', 'is-active', 'ramalama.service'],
+                capture_output=True,
+                text=True,
+                timeout=1
+            )
+            return result.stdout.strip() == 'active'
+        except Exception as e:
+            logger.warning(f"Could not check Ramalama service state: {e}")
+            return False
+    
     def GetCurrentModel(self) -> str:
         """
         Get the currently active model.
@@ -471,10 +648,10 @@ class henzaiService:
         """
         try:
             sessions = self.memory.list_sessions(limit)
-            return json.dumps(sessions)
+            return _json_dumps(sessions)
         except Exception as e:
             logger.error(f"Error listing sessions: {e}", exc_info=True)
-            return json.dumps([])
+            return _json_dumps([])
     
     def LoadSession(self, session_id: int) -> str:
         """
@@ -493,10 +670,10 @@ class henzaiService:
             # Load requested session
             context = self.memory.load_session(session_id)
             logger.info(f"Loaded session {session_id} with {len(context)} messages")
-            return json.dumps(context)
+            return _json_dumps(context)
         except Exception as e:
             logger.error(f"Error loading session: {e}", exc_info=True)
-            return json.dumps([])
+            return _json_dumps([])
     
     def DeleteSession(self, session_id: int) -> str:
         """
@@ -530,13 +707,11 @@ class henzaiService:
         """
         tool_calls = []
         
-        # Simple parsing for tool calls
-        # Format: <tool_call>JSON</tool_call>
-        import re
-        pattern = r'<tool_call>(.*?)</tool_call>'
-        matches = re.findall(pattern, response, re.DOTALL)
+        # Cheap substring test first: most replies contain no tool calls
+        if '<tool_call>' not in response:
+            return tool_calls
         
-        for match in matches:
+        for match in _TOOL_CALL_RE.findall(response):
             try:
                 tool_call = json.loads(match.strip())
                 tool_calls.append(tool_call)
@@ -645,6 +820,34 @@ class henzaiService:
         Args:
             message: User's input message
             
+        Returns:
+            Generation ID (actual response comes via signals)
+        """
+        return self._start_streaming(message, use_cache=True)
+    
+    def RegenerateStreaming(self, message: str) -> str:
+        """
+        Like SendMessageStreaming, but always asks the model for a fresh reply.
+        
+        A repeated request would otherwise be answered from the LLM
+        client's response cache.
+        
+        Args:
+            message: User's input message
+            
+        Returns:
+            Generation ID (actual response comes via signals)
+        """
+        return self._start_streaming(message, use_cache=False)
+    
+    def _start_streaming(self, message: str, use_cache: bool) -> str:
+        """
+        Start a streaming generation on a background thread.
+        
+        Args:
+            message: User's input message
+            use_cache: False to bypass the LLM client's response cache
+            
         Returns:
             Generation ID (actual response comes via signals)
         """
@@ -654,6 +857,9 @@ class henzaiService:
         # Generate unique ID for this generation
         generation_id = f"gen_{int(time.time() * 1000000)}"  # Microsecond timestamp
         self._current_generation_id = generation_id
+        # Cleared here, not on the worker, so a StopGeneration sent right
+        # after this call returns is not lost
+        self._stop_generation.clear()
         logger.info(f"Starting generation: {generation_id}")
         
         def background_streaming():
@@ -661,7 +867,6 @@ class henzaiService:
             logger.info(f"=== BACKGROUND STREAMING STARTED: {generation_id} ===")
             try:
                 self.status = "thinking"
-                self._stop_generation = False
                 logger.info(f"Received streaming message: {message[:50]}...")
                 
                 # Get conversation context from memory
@@ -669,51 +874,56 @@ class henzaiService:
                 logger.info(f"Got context: {len(context)} items")
                 
                 def chunk_handler(chunk):
-                    logger.info(f"!!! chunk_handler CALLED with: {chunk[:30]}...")
-                    if self._stop_generation or self._current_generation_id != generation_id:
-                        logger.info(f"Skipping chunk - stopped or old generation")
+                    # Runs on the stream-reading thread: keep it to a check and an append
+                    logger.debug("chunk_handler called with %d chars", len(chunk))
+                    if self._current_generation_id != generation_id:
+                        # Superseded: the LLM client now belongs to the newer generation
+                        logger.debug("Skipping chunk - old generation")
                         return
-                    # Emit from main loop thread for proper D-Bus signal delivery
-                    def emit():
-                        try:
-                            self.ResponseChunk(generation_id, chunk)
-                            logger.info(f"ResponseChunk signal emitted via GLib.idle_add: {generation_id}")
-                        except Exception as e:
-                            logger.error(f"Error emitting ResponseChunk: {e}", exc_info=True)
-                        return False  # Don't repeat
-                    GLib.idle_add(emit)
+                    if self._stop_generation.is_set():
+                        logger.debug("Skipping chunk - stopped")
+                        # Re-assert the stop in case it landed before the LLM reset its flag
+                        self.llm.stop_current_generation()
+                        return
+                    # Emitted from the main loop thread for proper D-Bus signal delivery
+                    self._queue_chunk("ResponseChunk", generation_id, chunk)
                 
                 def reasoning_handler(reasoning_chunk):
-                    logger.info(f"!!! reasoning_handler CALLED with: {reasoning_chunk[:30]}...")
-                    if self._stop_generation or self._current_generation_id != generation_id:
-                        logger.info(f"Skipping thinking chunk - stopped or old generation")
+                    logger.debug("reasoning_handler called with %d chars", len(reasoning_chunk))
+                    if self._current_generation_id != generation_id:
+                        # Superseded: the LLM client now belongs to the newer generation
+                        logger.debug("Skipping thinking chunk - old generation")
                         return
-                    # Emit from main loop thread for proper D-Bus signal delivery
-                    def emit():
-                        try:
-                            self.ThinkingChunk(generation_id, reasoning_chunk)
-                            logger.info(f"ThinkingChunk signal emitted via GLib.idle_add: {generation_id}")
-                        except Exception as e:
-                            logger.error(f"Error emitting ThinkingChunk: {e}", exc_info=True)
-                        return False  # Don't repeat
-                    GLib.idle_add(emit)
+                    if self._stop_generation.is_set():
+                        logger.debug("Skipping thinking chunk - stopped")
+                        # Re-assert the stop in case it landed before the LLM reset its flag
+                        self.llm.stop_current_generation()
+                        return
+                    # Emitted from the main loop thread for proper D-Bus signal delivery
+                    self._queue_chunk("ThinkingChunk", generation_id, reasoning_chunk)
                 
-                logger.info("About to call generate_response_streaming...")
-                # Generate streaming response
-                full_response = self.llm.generate_response_streaming(
-                    message, 
-                    context,
-                    chunk_callback=chunk_handler,
-                    reasoning_callback=reasoning_handler
-                )
+                # A stop that arrived before the request started skips it
+                full_response = ""
+                if not self._stop_generation.is_set():
+                    logger.info("About to call generate_response_streaming...")
+                    # Generate streaming response
+                    full_response = self.llm.generate_response_streaming(
+                        message, 
+                        context,
+                        chunk_callback=chunk_handler,
+                        reasoning_callback=reasoning_handler,
+                        max_batch_size=STREAM_BATCH_SIZE,
+                        use_cache=use_cache
+                    )
                 logger.info(f"generate_response_streaming returned: {len(full_response)} chars")
                 
-                if self._stop_generation or self._current_generation_id != generation_id:
+                if self._stop_generation.is_set() or self._current_generation_id != generation_id:
                     logger.info(f"Generation stopped or superseded: {generation_id}")
                     self.status = "ready"
                     # Emit completion signal even if stopped
                     def emit_complete():
                         try:
+                            self._flush_chunks()
                             self.StreamingComplete(generation_id)
                             logger.info(f"StreamingComplete signal emitted (stopped): {generation_id}")
                         except Exception as e:
@@ -734,6 +944,7 @@ class henzaiService:
                 # Emit completion signal
                 def emit_complete():
                     try:
+                        self._flush_chunks()
                         self.StreamingComplete(generation_id)
                         logger.info(f"StreamingComplete signal emitted (success): {generation_id}")
                     except Exception as e:
@@ -745,17 +956,12 @@ class henzaiService:
                 logger.error(f"Error in streaming response: {e}", exc_info=True)
                 # Emit error as a chunk so UI sees it (via main loop)
                 error_msg = f"\n\n❌ Error: {str(e)}\n\nPlease check if Ramalama is running:\n  systemctl --user status ramalama\n\nOr restart the daemon:\n  systemctl --user restart henzai-daemon"
-                def emit_error():
-                    try:
-                        self.ResponseChunk(generation_id, error_msg)
-                    except Exception as emit_err:
-                        logger.error(f"Error emitting error message: {emit_err}")
-                    return False
-                GLib.idle_add(emit_error)
+                self._queue_chunk("ResponseChunk", generation_id, error_msg)
                 
                 # Emit completion signal after error
                 def emit_complete_error():
                     try:
+                        self._flush_chunks()
                         self.StreamingComplete(generation_id)
                         logger.info(f"StreamingComplete signal emitted (error): {generation_id}")
                     except Exception as e:
@@ -772,6 +978,74 @@ class henzaiService:
         # Return generation ID immediately - signals will deliver the actual response
         return generation_id
     
+    def _queue_chunk(self, signal_name: str, generation_id: str, text: str):
+        """
+        Queue a streamed chunk for emission from the main loop.
+        
+        Consecutive chunks for the same signal and generation are merged,
+        and a single timer emits everything queued within CHUNK_FLUSH_MS,
+        so a long answer costs a few signals per second instead of one
+        per token. Safe to call from any thread.
+        
+        Args:
+            signal_name: "ResponseChunk" or "ThinkingChunk"
+            generation_id: Generation the chunk belongs to
+            text: Chunk text
+        """
+        with self._chunk_lock:
+            pending = self._pending_chunks
+            if pending and pending[-1][0] == signal_name and pending[-1][1] == generation_id:
+                pending[-1][2].append(text)
+            else:
+                pending.append([signal_name, generation_id, [text]])
+            if not self._flush_source_id:
+                if CHUNK_FLUSH_MS:
+                    self._flush_source_id = GLib.timeout_add(CHUNK_FLUSH_MS, self._on_flush_timeout)
+                else:
+                    self._flush_source_id = GLib.idle_add(self._on_flush_timeout)
+    
+    def _on_flush_timeout(self) -> bool:
+        """
+        Emit queued chunks when the flush source fires (main loop only).
+        
+        Returns:
+            False so GLib removes the flush source
+        """
+        with self._chunk_lock:
+            pending = self._pending_chunks
+            self._pending_chunks = []
+            self._flush_source_id = 0
+        self._emit_chunks(pending)
+        return False
+    
+    def _flush_chunks(self):
+        """
+        Emit all queued chunks now and cancel the armed flush source.
+        
+        Called before StreamingComplete so no chunk trails the completion
+        signal (main loop only).
+        """
+        with self._chunk_lock:
+            if self._flush_source_id:
+                GLib.source_remove(self._flush_source_id)
+                self._flush_source_id = 0
+            pending = self._pending_chunks
+            self._pending_chunks = []
+        self._emit_chunks(pending)
+    
+    def _emit_chunks(self, pending: list):
+        """
+        Emit queued chunks in arrival order.
+        
+        Args:
+            pending: [signal name, generation id, text pieces] entries
+        """
+        for signal_name, generation_id, pieces in pending:
+            try:
+                getattr(self, signal_name)(generation_id, "".join(pieces))
+            except Exception as e:
+                logger.error(f"Error emitting {signal_name}: {e}", exc_info=True)
+    
     def StopGeneration(self) -> bool:
         """
         Stop the current LLM generation.
@@ -780,7 +1054,7 @@ class henzaiService:
             True if stop signal was sent
         """
         logger.info("Stop generation requested")
-        self._stop_generation = True
+        self._stop_generation.set()
         self.llm.stop_current_generation()
         self.status = "ready"
         return True
@@ -4,13 +4,122 @@ Handles all LLM inference, prompt management, and response generation.
 """
 
 import logging
+import os
+import re
 import subprocess
 import json
+import threading
+import time
 import requests
-from typing import List, Dict, Any, Optional, Union, Generator
+from collections import OrderedDict
+from requests.adapters import HTTPAdapter
+from typing import List, Dict, Any, Optional, Tuple, Union, Generator
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+    _json_dumps = orjson.dumps
+except ImportError:  # orjson is optional, fall back to stdlib
+    _json_loads = json.loads
+    
+    def _json_dumps(obj) -> bytes:
+        return json.dumps(obj).encode('utf-8')
 
 logger = logging.getLogger(__name__)
 
+# Reasoning tag patterns used by parse_reasoning_response
+_THINK_RE = re.compile(r'<think>(.*?)</think>(.*)', re.DOTALL)
+_REASONING_RE = re.compile(r'<reasoning>(.*?)</reasoning>(.*)', re.DOTALL)
+
+# `ramalama list` output patterns used by list_available_models
+_RAMALAMA_LIST_RE = re.compile(r'(\S+)\s+(.+?)\s+(\S+\s+\S+)\s*$')
+_SIZE_RE = re.compile(r'([\d.]+)\s*(GB|MB|KB)')
+_SIZE_MULT = {'GB': 1024 ** 3, 'MB': 1024 ** 2, 'KB': 1024}
+
+# Server-Sent Events framing used by the streaming chat completion API
+_SSE_DATA = b'data: '
+_SSE_DATA_LEN = len(_SSE_DATA)
+_SSE_DONE = b'[DONE]'
+
+
+def _format_size(size_bytes: int) -> str:
+    """Format a byte count the way `ramalama list` does (e.g., "8.37 GB")."""
+    for unit, mult in _SIZE_MULT.items():
+        if size_bytes >= mult:
+            return f"{size_bytes / mult:.2f} {unit}"
+    return f"{size_bytes} B"
+
+
+def _iter_sse_lines(chunks):
+    """
+    Split a stream of raw byte chunks into lines.
+    
+    Buffers partial lines across chunk boundaries and strips a trailing
+    carriage return, so CRLF and LF framed streams behave the same.
+    
+    Args:
+        chunks: Iterable of bytes as received from the socket
+        
+    Yields:
+        Complete lines as bytes, without the line terminator
+    """
+    buf = b""
+    for chunk in chunks:
+        if not chunk:
+            continue
+        # One C-level split per network chunk; the last piece is an incomplete line.
+        # Chunks usually end on a line boundary, so skip the concat copy then.
+        lines = (buf + chunk if buf else chunk).split(b'\n')
+        buf = lines.pop()
+        for line in lines:
+            yield line.rstrip(b'\r')
+    if buf:
+        yield buf.rstrip(b'\r')
+
+
+class _ChunkBatcher:
+    """
+    Coalesce streamed text deltas into fewer callback invocations.
+    
+    The batch size starts at min_size, so the first token is delivered
+    immediately, and grows by growth_factor after each flush up to
+    max_size. Pending text is also flushed once flush_interval seconds
+    have passed since the last flush. With max_size=1 every delta is
+    passed through unchanged.
+    """
+    
+    __slots__ = ('_callback', '_pending', '_size', '_max_size', '_growth',
+                 '_interval', '_last_flush')
+    
+    def __init__(self, callback, min_size: int = 1, max_size: int = 1,
+                 growth_factor: int = 3, flush_interval: float = 0.025):
+        self._callback = callback
+        self._pending: List[str] = []
+        self._size = max(1, min(min_size, max_size))
+        self._max_size = max(1, max_size)
+        self._growth = growth_factor
+        self._interval = flush_interval
+        self._last_flush = time.monotonic()
+    
+    def add(self, text: str):
+        """Queue a delta, flushing if the batch is full or overdue."""
+        pending = self._pending
+        pending.append(text)
+        if len(pending) >= self._size or time.monotonic() - self._last_flush >= self._interval:
+            self.flush()
+            if self._size < self._max_size:
+                self._size = min(self._size * self._growth, self._max_size)
+    
+    def flush(self):
+        """Deliver all queued text as a single callback invocation."""
+        pending = self._pending
+        if pending:
+            text = pending[0] if len(pending) == 1 else "".join(pending)
+            pending.clear()
+            self._callback(text)
+            self._last_flush = time.monotonic()
+
+
 # System prompt template (model info will be inserted dynamically)
 SYSTEM_PROMPT_TEMPLATE = """You are henzai, an AI assistant integrated into the GNOME desktop environment.
 
@@ -47,7 +156,41 @@ class LLMClient:
         'claude-3-opus',       # With extended thinking
     ]
     
-    def __init__(self, model: Optional[str] = None, api_url: str = "http://127.0.0.1:8080", reasoning_enabled: bool = False):
+    # Seconds a `ramalama list` result stays fresh in list_available_models
+    _MODELS_TTL = 30.0
+    
+    # Completed streaming responses kept for exact replay of repeated requests.
+    # Answers are sampled (and may be time-dependent), so entries only live
+    # long enough to absorb duplicate sends; regenerating bypasses them and
+    # starting a new conversation drops them
+    _RESPONSE_CACHE_SIZE = 32
+    _RESPONSE_CACHE_TTL = 30.0
+    
+    # Prior turns sent with each request, newest first until either limit is
+    # hit (~4 chars per token, so the budget is roughly 1500 prompt tokens)
+    _CONTEXT_TURNS = 5
+    _CONTEXT_CHAR_BUDGET = 6000
+    
+    # Sampling temperature indexed by reasoning support: 0.6 for reasoning
+    # models (DeepSeek recommendation), 0.7 otherwise
+    _TEMPS = (0.7, 0.6)
+    
+    # Seconds to wait for the TCP connect to Ramalama. The API is on
+    # loopback, where a connect succeeds or is refused immediately.
+    _CONNECT_TIMEOUT = 5
+    
+    # Request headers for pre-serialized chat completion bodies
+    # (session defaults already Accept JSON; streaming overrides it for SSE)
+    _JSON_HEADERS = {"Content-Type": "application/json"}
+    _SSE_HEADERS = {"Content-Type": "application/json", "Accept": "text/event-stream"}
+    
+    def __init__(
+        self,
+        model: Optional[str] = None,
+        api_url: str = "http://127.0.0.1:8080",
+        reasoning_enabled: bool = False,
+        reasoning_cache_path: Optional[str] = None
+    ):
         """
         Initialize the LLM client.
         
@@ -55,26 +198,129 @@ class LLMClient:
             model: Model name to use (default: auto-detect or use llama3.2)
             api_url: Ramalama API endpoint URL
             reasoning_enabled: Whether to enable reasoning mode for capable models
+            reasoning_cache_path: Optional JSON file persisting reasoning probe
+                                  results across restarts (default: in-memory only)
         """
         self.api_url = api_url
-        self.model = model or "llama3.2"
+        self.model = model or "llama3.2"  # Also renders the cached system message
         self.reasoning_enabled = reasoning_enabled
         self._current_request = None  # Track current streaming request for cancellation
+        self._request_lock = threading.Lock()  # Guards _current_request across threads
+        self._stop_event = threading.Event()  # Set by stop_current_generation
+        self._reasoning_cache_path = reasoning_cache_path
+        self._reasoning_cache: Dict[str, bool] = self._load_reasoning_cache()  # model -> supports reasoning
+        self._models_cache = None  # (monotonic timestamp, models) from list_available_models
+        self._models_lock = threading.Lock()
+        self._models_thread = None  # Background model list refresh
+        # (model, reasoning, serialized messages) -> (monotonic time, reasoning text, response), LRU order
+        self._response_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._response_cache_lock = threading.Lock()
+        
+        # Reuse one pooled session for all Ramalama calls (keeps loopback sockets warm)
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=0)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        # Loopback endpoint: skip gzip negotiation (it would also break SSE framing)
+        self._session.headers.update({
+            "Accept-Encoding": "identity",
+            "Connection": "keep-alive",
+            "Accept": "application/json",
+        })
         logger.info(f"Initialized LLM client with model: {self.model}, API: {api_url}, reasoning: {reasoning_enabled}")
     
-    def supports_reasoning(self) -> bool:
+    @property
+    def model(self) -> str:
+        """Model name currently served by Ramalama."""
+        return self._model
+    
+    @model.setter
+    def model(self, value: str):
+        self._model = value
+        # System prompt only depends on the model, so render it once per change
+        model_display_name = value.split('/')[-1].replace(':latest', '')
+        self._system_message = {
+            "role": "system",
+            "content": SYSTEM_PROMPT_TEMPLATE.format(model_name=model_display_name)
+        }
+    
+    def supports_reasoning(self, model: Optional[str] = None) -> bool:
         """
         Check if the current model supports reasoning/thinking.
         
         Checks both Ramalama's capabilities field (if available) and
         known reasoning model patterns.
         
+        The result is cached per model (and persisted to disk when a
+        cache path is configured), so the probe only runs once per model.
+        A guess made while Ramalama could not be queried (e.g. still
+        loading) is not cached, so a later call probes again.
+        
+        Args:
+            model: Model to check (default: the current model)
+        
         Returns:
             True if model supports reasoning
         """
+        if model is None:
+            model = self.model
+        if model in self._reasoning_cache:
+            return self._reasoning_cache[model]
+        
+        supports, confirmed = self._probe_reasoning_support(model)
+        if confirmed:
+            self._reasoning_cache[model] = supports
+            self._save_reasoning_cache()
+        return supports
+    
+    def _load_reasoning_cache(self) -> Dict[str, bool]:
+        """
+        Load persisted reasoning probe results.
+        
+        Returns:
+            Dict mapping model name to reasoning support (empty if unavailable)
+        """
+        if not self._reasoning_cache_path:
+            return {}
+        try:
+            with open(self._reasoning_cache_path, 'r') as f:
+                cache = json.load(f)
+            return {k: v for k, v in cache.items() if isinstance(v, bool)}
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable reasoning cache: {e}")
+            return {}
+    
+    def _save_reasoning_cache(self):
+        """Persist reasoning probe results, if a cache path was configured."""
+        if not self._reasoning_cache_path:
+            return
+        try:
+            try:
+                f = open(self._reasoning_cache_path, 'w')
+            except FileNotFoundError:
+                # Only the very first write needs to create the cache directory
+                os.makedirs(os.path.dirname(self._reasoning_cache_path), exist_ok=True)
+                f = open(self._reasoning_cache_path, 'w')
+            with f:
+                json.dump(self._reasoning_cache, f)
+        except Exception as e:
+            logger.warning(f"Could not save reasoning cache: {e}")
+    
+    def _probe_reasoning_support(self, model: str) -> Tuple[bool, bool]:
+        """
+        Probe Ramalama metadata and known model patterns for reasoning support.
+        
+        Args:
+            model: Model name to check
+            
+        Returns:
+            (supports reasoning, whether /v1/models answered successfully)
+        """
         # First, try to check Ramalama's model metadata
         try:
-            response = requests.get(
+            response = self._session.get(
                 f"{self.api_url}/v1/models",
                 timeout=2
             )
@@ -82,16 +328,36 @@ class LLMClient:
                 data = response.json()
                 # Check if any model matches and has 'reasoning' capability
                 for model_data in data.get('models', []):
-                    if self.model in model_data.get('name', '') or self.model in model_data.get('model', ''):
+                    if model in model_data.get('name', '') or model in model_data.get('model', ''):
                         capabilities = model_data.get('capabilities', [])
                         if 'reasoning' in capabilities or 'thinking' in capabilities:
-                            return True
-        except:
-            pass  # Fall back to pattern matching
+                            return True, True
+                confirmed = True
+            else:
+                confirmed = False
+        except (requests.RequestException, ValueError, AttributeError, TypeError) as e:
+            # ValueError covers invalid JSON; the others a malformed payload
+            logger.debug(f"Reasoning probe failed for {model}: {e}")
+            confirmed = False
         
         # Fall back to pattern matching for known reasoning models
-        model_lower = self.model.lower()
-        return any(reasoning_model in model_lower for reasoning_model in self.REASONING_MODELS)
+        model_lower = model.lower()
+        return any(reasoning_model in model_lower for reasoning_model in self.REASONING_MODELS), confirmed
+    
+    def get_health(self, timeout: float = 2) -> requests.Response:
+        """
+        Query Ramalama's /health endpoint over the pooled session.
+        
+        Frequent status polls go through here, which also keeps the
+        keep-alive socket warm for the next completion request.
+        
+        Args:
+            timeout: Request timeout in seconds
+            
+        Returns:
+            The raw HTTP response (request exceptions propagate to the caller)
+        """
+        return self._session.get(f"{self.api_url}/health", timeout=timeout)
     
     def parse_reasoning_response(self, text: str) -> Dict[str, str]:
         """
@@ -107,17 +373,15 @@ class LLMClient:
         Returns:
             Dict with 'thinking' and 'answer' keys
         """
-        import re
-        
         # Try to find reasoning tags
-        think_match = re.search(r'<think>(.*?)</think>(.*)', text, re.DOTALL)
+        think_match = _THINK_RE.search(text)
         if think_match:
             return {
                 'thinking': think_match.group(1).strip(),
                 'answer': think_match.group(2).strip()
             }
         
-        reasoning_match = re.search(r'<reasoning>(.*?)</reasoning>(.*)', text, re.DOTALL)
+        reasoning_match = _REASONING_RE.search(text)
         if reasoning_match:
             return {
                 'thinking': reasoning_match.group(1).strip(),
@@ -138,21 +402,12 @@ class LLMClient:
             Model name string
         """
         try:
-            # Try to list available models
-            result = subprocess.run(
-                ['ramalama', 'list'],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            
-            if result.returncode == 0 and result.stdout:
-                # Parse output and get first model
-                lines = result.stdout.strip().split('\n')
-                if len(lines) > 1:  # Skip header
-                    first_model = lines[1].split()[0]
-                    logger.info(f"Found model: {first_model}")
-                    return first_model
+            # First listed model (shares the list_available_models cache)
+            models = self.list_available_models()
+            if models:
+                first_model = models[0]['id']
+                logger.info(f"Found model: {first_model}")
+                return first_model
             
             # Fallback to a common default
             logger.warning("No models found, using default: llama3.2")
@@ -167,14 +422,77 @@ class LLMClient:
         List all available models from Ramalama.
         Uses CLI first to get ALL downloaded models, falls back to API if CLI unavailable.
         
+        Results are cached so repeated UI refreshes don't spawn a new
+        `ramalama` process each time. Once older than _MODELS_TTL seconds,
+        the cached list is still returned immediately while a background
+        thread refreshes it; only the very first call blocks on the CLI.
+        
         Returns:
             List of model dictionaries with name, size, and other metadata
         """
-        # Try CLI first (shows ALL downloaded models)
+        cache = self._models_cache
+        if cache is not None:
+            cached_at, cached_models = cache
+            if time.monotonic() - cached_at >= self._MODELS_TTL:
+                self.prefetch_models()
+            return cached_models
+        
+        return self._refresh_models()
+    
+    def prefetch_models(self):
+        """Refresh the model list cache in a background thread."""
+        with self._models_lock:
+            if self._models_thread is not None and self._models_thread.is_alive():
+                return  # Refresh already in flight
+            self._models_thread = threading.Thread(target=self._refresh_models, daemon=True)
+            self._models_thread.start()
+    
+    def _refresh_models(self) -> List[Dict[str, Any]]:
+        """
+        Query Ramalama for models and update the cache.
+        
+        Returns:
+            List of model dictionaries
+        """
+        models = self._list_models_cli()
+        if models is None:
+            models = self._list_models_api()
+        
+        if models:
+            self._models_cache = (time.monotonic(), models)
+        return models
+    
+    def _list_models_cli(self) -> Optional[List[Dict[str, Any]]]:
+        """
+        List downloaded models via the `ramalama list` CLI.
+        
+        Prefers `ramalama list --json`, and only falls back to parsing the
+        human-readable table if the installed ramalama rejects the flag.
+        
+        Returns:
+            List of model dictionaries, or None if the CLI is unavailable
+        """
         try:
-            import subprocess
-            import re
+            result = subprocess.run(
+                ['ramalama', 'list', '--json'],
+                capture_output=True,
+                text=True,
+                timeout=10
+            )
             
+            if result.returncode == 0:
+                try:
+                    entries = json.loads(result.stdout or '[]')
+                    models = [
+                        self._model_info(entry['name'], int(entry.get('size', 0)))
+                        for entry in entries
+                    ]
+                    logger.info(f"Found {len(models)} available models from CLI (ramalama list --json)")
+                    return models
+                except (ValueError, KeyError, TypeError) as e:
+                    logger.warning(f"Could not parse ramalama list --json output: {e}")
+            
+            # Older ramalama without --json: parse the table output
             result = subprocess.run(
                 ['ramalama', 'list'],
                 capture_output=True,
@@ -190,34 +508,17 @@ class LLMClient:
                 for line in lines[1:]:
                     # Parse: NAME MODIFIED SIZE
                     # Example: ollama://library/deepseek-r1:14b    2 hours ago 8.37 GB
-                    match = re.match(r'(\S+)\s+(.+?)\s+(\S+\s+\S+)\s*$', line.strip())
+                    match = _RAMALAMA_LIST_RE.match(line.strip())
                     if match:
-                        model_name = match.group(1)
                         size_str = match.group(3)
                         
                         # Parse size (e.g., "8.37 GB" -> bytes)
                         size_bytes = 0
-                        size_match = re.match(r'([\d.]+)\s*(GB|MB|KB)', size_str)
+                        size_match = _SIZE_RE.match(size_str)
                         if size_match:
-                            size_val = float(size_match.group(1))
-                            size_unit = size_match.group(2)
-                            if size_unit == 'GB':
-                                size_bytes = int(size_val * 1024 * 1024 * 1024)
-                            elif size_unit == 'MB':
-                                size_bytes = int(size_val * 1024 * 1024)
-                            elif size_unit == 'KB':
-                                size_bytes = int(size_val * 1024)
+                            size_bytes = int(float(size_match.group(1)) * _SIZE_MULT[size_match.group(2)])
                         
-                        model_info = {
-                            'id': model_name,
-                            'name': model_name.split('/')[-1],  # Short name with variant
-                            'full_name': model_name,
-                            'size': size_bytes,
-                            'size_str': size_str,
-                            'params': 0,  # Not available from CLI
-                            'context': 0,  # Not available from CLI
-                        }
-                        models.append(model_info)
+                        models.append(self._model_info(match.group(1), size_bytes, size_str))
                 
                 logger.info(f"Found {len(models)} available models from CLI (ramalama list)")
                 return models
@@ -227,9 +528,43 @@ class LLMClient:
         except Exception as e:
             logger.warning(f"CLI unavailable, falling back to API: {e}")
         
+        return None
+    
+    @staticmethod
+    def _model_info(model_name: str, size_bytes: int, size_str: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Build a model dictionary from `ramalama list` data.
+        
+        Args:
+            model_name: Full model name (e.g., "ollama://library/deepseek-r1:14b")
+            size_bytes: Model size in bytes
+            size_str: Human-readable size (derived from size_bytes if None)
+            
+        Returns:
+            Model dictionary in the shape returned by list_available_models
+        """
+        if size_str is None:
+            size_str = _format_size(size_bytes)
+        return {
+            'id': model_name,
+            'name': model_name.split('/')[-1],  # Short name with variant
+            'full_name': model_name,
+            'size': size_bytes,
+            'size_str': size_str,
+            'params': 0,  # Not available from CLI
+            'context': 0,  # Not available from CLI
+        }
+    
+    def _list_models_api(self) -> List[Dict[str, Any]]:
+        """
+        List models via the Ramalama HTTP API.
+        
+        Returns:
+            List of model dictionaries (only the currently served model)
+        """
         # Fallback to API (only shows currently served model)
         try:
-            response = requests.get(
+            response = self._session.get(
                 f"{self.api_url}/v1/models",
                 timeout=5
             )
@@ -358,27 +693,48 @@ Please provide a natural language response to the user about what was done."""
         Returns:
             List of message dicts with role and content
         """
-        # Generate system prompt with current model name
-        model_display_name = self.model.split('/')[-1].replace(':latest', '')
-        system_prompt = SYSTEM_PROMPT_TEMPLATE.format(model_name=model_display_name)
-        
-        messages = [
-            {"role": "system", "content": system_prompt}
-        ]
+        # System prompt is pre-rendered whenever the model changes
+        messages = [self._system_message]
         
-        # Add conversation context
+        # Add conversation context; turn keys match the API roles
         if context:
-            for turn in context[-5:]:  # Last 5 turns
-                if turn.get('user'):
-                    messages.append({"role": "user", "content": turn['user']})
-                if turn.get('assistant'):
-                    messages.append({"role": "assistant", "content": turn['assistant']})
+            messages.extend(
+                {"role": role, "content": turn[role]}
+                for turn in self._trim_context(context)
+                for role in ('user', 'assistant')
+                if turn.get(role)
+            )
         
         # Add current message
         messages.append({"role": "user", "content": message})
         
         return messages
     
+    def _trim_context(self, context: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """
+        Select the prior turns to send, keeping prompt prefill small.
+        
+        Walks back from the newest turn and stops after _CONTEXT_TURNS
+        turns or once _CONTEXT_CHAR_BUDGET characters are used. The newest
+        turn is always kept so follow-up questions keep their referent.
+        
+        Args:
+            context: Previous conversation turns, oldest first
+            
+        Returns:
+            Trailing slice of context, oldest first
+        """
+        budget = self._CONTEXT_CHAR_BUDGET
+        recent = context[-self._CONTEXT_TURNS:]
+        start = len(recent)
+        while start > 0:
+            turn = recent[start - 1]
+            budget -= len(turn.get('user') or '') + len(turn.get('assistant') or '')
+            if budget < 0 and start < len(recent):
+                break
+            start -= 1
+        return recent[start:]
+    
     def _call_ramalama_api(self, messages: List[Dict[str, str]]) -> str:
         """
         Call Ramalama HTTP API to generate response.
@@ -392,24 +748,24 @@ Please provide a natural language response to the user about what was done."""
         try:
             logger.debug(f"Calling Ramalama API at {self.api_url}")
             
-            # Use temperature 0.6 for reasoning models (DeepSeek recommendation)
-            temp = 0.6 if (self.reasoning_enabled and self.supports_reasoning()) else 0.7
+            reasoning = self.reasoning_enabled and self.supports_reasoning()
             
             payload = {
                 "model": self.model,
                 "messages": messages,
                 "stream": False,
-                "temperature": temp
+                "temperature": self._TEMPS[reasoning]
             }
             
             # Enable reasoning mode in API if supported
-            if self.reasoning_enabled and self.supports_reasoning():
+            if reasoning:
                 payload["reasoning"] = True
             
-            response = requests.post(
+            response = self._session.post(
                 f"{self.api_url}/v1/chat/completions",
-                json=payload,
-                timeout=(30, 300)  # (connection timeout, read timeout) - 5 minutes for non-streaming
+                data=_json_dumps(payload),
+                headers=self._JSON_HEADERS,
+                timeout=(self._CONNECT_TIMEOUT, 300)  # (connection timeout, read timeout) - 5 minutes for non-streaming
             )
             
             if response.status_code != 200:
@@ -460,43 +816,94 @@ Please provide a natural language response to the user about what was done."""
         Returns:
             Formatted string
         """
-        formatted = []
-        for result in tool_results:
-            tool_name = result.get('tool', 'unknown')
-            if result.get('success'):
-                formatted.append(f"✓ {tool_name}: {result.get('result', 'Success')}")
-            else:
-                formatted.append(f"✗ {tool_name}: {result.get('error', 'Failed')}")
-        
-        return "\n".join(formatted)
+        return "\n".join(
+            f"✓ {result.get('tool', 'unknown')}: {result.get('result', 'Success')}"
+            if result.get('success') else
+            f"✗ {result.get('tool', 'unknown')}: {result.get('error', 'Failed')}"
+            for result in tool_results
+        )
     
     def generate_response_streaming(
         self, 
         message: str, 
         context: List[Dict[str, str]] = None,
         chunk_callback = None,
-        reasoning_callback = None
+        reasoning_callback = None,
+        max_batch_size: int = 1,
+        use_cache: bool = True
     ) -> str:
         """
         Generate a streaming response to a user message.
         Calls chunk_callback for each chunk received.
         Calls reasoning_callback for reasoning content (if reasoning mode enabled).
         
+        Completed responses are cached by model and exact request for
+        _RESPONSE_CACHE_TTL seconds, so a duplicate send replays the cached
+        reasoning and answer without calling Ramalama.
+        
         Args:
             message: User's input message
             context: Previous conversation context
             chunk_callback: Function to call with each chunk of text
             reasoning_callback: Function to call with each reasoning chunk
+            max_batch_size: Maximum number of deltas coalesced into one
+                            callback invocation (1 disables batching)
+            use_cache: False to always ask the model (e.g., to regenerate)
             
         Returns:
             Complete AI-generated response
         """
+        # A stop only applies to the generation it was issued for; clear it
+        # once here, before any I/O, so a stop that arrives while the request
+        # is being set up is still honoured by the streaming loop
+        self._stop_event.clear()
         try:
             # Build messages for chat completion API
             messages = self._build_messages(message, context)
             
+            key = (self.model, self.reasoning_enabled, _json_dumps(messages))
+            cached = None
+            if use_cache:
+                with self._response_cache_lock:
+                    cached = self._response_cache.get(key)
+                    if cached is not None:
+                        if time.monotonic() - cached[0] < self._RESPONSE_CACHE_TTL:
+                            self._response_cache.move_to_end(key)
+                        else:
+                            del self._response_cache[key]
+                            cached = None
+            if cached is not None:
+                logger.info("Replaying cached response")
+                _, reasoning_text, response = cached
+                if reasoning_text and reasoning_callback:
+                    reasoning_callback(reasoning_text)
+                if response and chunk_callback:
+                    chunk_callback(response)
+                return response
+            
+            # Record reasoning as it is forwarded so a cache hit can replay it
+            reasoning_parts: List[str] = []
+            record_reasoning = None
+            if reasoning_callback:
+                def record_reasoning(text):
+                    reasoning_parts.append(text)
+                    reasoning_callback(text)
+            
             # Call Ramalama API with streaming
-            response = self._call_ramalama_api_streaming(messages, chunk_callback, reasoning_callback)
+            response = self._call_ramalama_api_streaming(
+                messages, chunk_callback, record_reasoning, max_batch_size=max_batch_size
+            )
+            
+            # Only complete answers are reusable; a stopped stream is partial,
+            # and without a reasoning_callback any thinking went unrecorded
+            reasoning_recorded = record_reasoning is not None or not (
+                self.reasoning_enabled and self.supports_reasoning()
+            )
+            if response and reasoning_recorded and not self._stop_event.is_set():
+                with self._response_cache_lock:
+                    self._response_cache[key] = (time.monotonic(), "".join(reasoning_parts), response)
+                    if len(self._response_cache) > self._RESPONSE_CACHE_SIZE:
+                        self._response_cache.popitem(last=False)
             
             return response
             
@@ -504,162 +911,231 @@ Please provide a natural language response to the user about what was done."""
             logger.error(f"Error generating streaming response: {e}", exc_info=True)
             return f"I encountered an error: {str(e)}"
     
+    def clear_response_cache(self):
+        """Forget cached responses, e.g. when the user starts over."""
+        with self._response_cache_lock:
+            self._response_cache.clear()
+    
     def _call_ramalama_api_streaming(
         self, 
         messages: List[Dict[str, str]],
         chunk_callback = None,
-        reasoning_callback = None
+        reasoning_callback = None,
+        max_batch_size: int = 1,
+        min_batch_size: int = 1,
+        growth_factor: int = 3,
+        flush_interval: float = 0.025
     ) -> str:
         """
         Call Ramalama HTTP API with streaming to generate response.
         
+        Deltas are handed to the callbacks in batches: the first one goes
+        out on its own (fast time to first token), then batches grow by
+        growth_factor up to max_batch_size deltas, and anything pending
+        is flushed after flush_interval seconds or at the end of the stream.
+        
+        The stop flag is not reset here; generate_response_streaming clears
+        it once per generation. On stop, text that is still batched is
+        delivered before returning, so the callbacks always receive exactly
+        the partial response that is returned.
+        
         Args:
             messages: List of message dicts for chat completion
             chunk_callback: Function to call with each chunk
             reasoning_callback: Function to call with each reasoning chunk
+            max_batch_size: Maximum deltas per callback (1 disables batching)
+            min_batch_size: Batch size of the first flush
+            growth_factor: Batch size multiplier applied after each flush
+            flush_interval: Seconds after which pending deltas are flushed
             
         Returns:
             Complete generated response
         """
+        # Collect content pieces and join once at the end (avoids O(n^2) str +=)
+        chunks: List[str] = []
+        response = None
+        content_batch = reasoning_batch = None
+        stopped = self._stop_event.is_set
+        
+        def flush_batches():
+            if reasoning_batch:
+                reasoning_batch.flush()
+            if content_batch:
+                content_batch.flush()
+        
+        if stopped():
+            logger.info("Generation stopped before the request was sent")
+            return ""
         try:
             logger.debug(f"Calling Ramalama API (streaming) at {self.api_url}")
             
-            # Use temperature 0.6 for reasoning models (DeepSeek recommendation)
-            temp = 0.6 if (self.reasoning_enabled and self.supports_reasoning()) else 0.7
+            reasoning = self.reasoning_enabled and self.supports_reasoning()
             
             payload = {
                 "model": self.model,
                 "messages": messages,
                 "stream": True,  # Enable streaming
-                "temperature": temp
+                "temperature": self._TEMPS[reasoning]
             }
             
             # Enable reasoning mode in API if supported
-            if self.reasoning_enabled and self.supports_reasoning():
+            if reasoning:
                 payload["reasoning"] = True
                 logger.info(f"Streaming: Reasoning enabled for API call (model: {self.model})")
             else:
-                logger.info(f"Streaming: Reasoning NOT enabled (enabled={self.reasoning_enabled}, supports={self.supports_reasoning()})")
+                logger.info(f"Streaming: Reasoning NOT enabled (enabled={self.reasoning_enabled})")
             
             # Make streaming request
-            # timeout=None means no timeout on initial connection
-            # We'll handle read timeouts separately in the streaming loop
-            self._current_request = requests.post(
+            # Only the connect is bounded: reasoning models can think for
+            # minutes between tokens, and stop closes the socket explicitly.
+            # The session sends Accept-Encoding: identity, so reads skip gzip.
+            response = self._session.post(
                 f"{self.api_url}/v1/chat/completions",
-                json=payload,
-                timeout=(30, None),  # (connection timeout, read timeout) - None means infinite read timeout
+                data=_json_dumps(payload),
+                headers=self._SSE_HEADERS,
+                timeout=(self._CONNECT_TIMEOUT, None),  # (connection timeout, read timeout) - None means infinite read timeout
                 stream=True  # Important: enable streaming response
             )
+            with self._request_lock:
+                self._current_request = response
             
-            if self._current_request.status_code != 200:
-                error_msg = f"API error {self._current_request.status_code}"
-                if self._current_request.status_code == 503:
+            if response.status_code != 200:
+                error_msg = f"API error {response.status_code}"
+                if response.status_code == 503:
                     error_msg += " - Model is still loading, please wait a moment and try again"
                 else:
                     try:
-                        error_details = self._current_request.json()
-                        error_msg += f": {error_details.get('error', {}).get('message', self._current_request.text[:200])}"
+                        error_details = response.json()
+                        error_msg += f": {error_details.get('error', {}).get('message', response.text[:200])}"
                     except:
-                        error_msg += f": {self._current_request.text[:200]}"
+                        error_msg += f": {response.text[:200]}"
                 logger.error(error_msg)
                 raise Exception(error_msg)
             
             # Process streaming response (SSE format)
             # No idle timeout needed - the stream will naturally end when complete
-            # The connection timeout (30s) protects against initial connection failures
-            full_response = ""
+            # The connection timeout (_CONNECT_TIMEOUT) protects against initial connection failures
             
-            # Use iter_lines to process Server-Sent Events
-            for line in self._current_request.iter_lines(decode_unicode=True):
-                if not line:
-                    # Empty line - normal SSE heartbeat, just continue
+            # Bind hot names locally; this loop runs once per streamed token
+            loads = _json_loads
+            debug = logger.debug
+            append = chunks.append
+            batch_args = (min_batch_size, max_batch_size, growth_factor, flush_interval)
+            content_batch = _ChunkBatcher(chunk_callback, *batch_args) if chunk_callback else None
+            reasoning_batch = _ChunkBatcher(reasoning_callback, *batch_args) if reasoning_callback else None
+            
+            # Split raw bytes into Server-Sent Event lines ourselves; json.loads
+            # takes bytes directly, so no per-line unicode decode is needed
+            for line in _iter_sse_lines(response.iter_content(chunk_size=None)):
+                # Cooperative stop: checked per line, no exception needed
+                if stopped():
+                    logger.info("Streaming stopped by user")
+                    break
+                
+                # SSE format: "data: {json}" (empty heartbeat lines are skipped here too)
+                if not line.startswith(_SSE_DATA):
                     continue
                 
-                # SSE format: "data: {json}"
-                if line.startswith('data: '):
-                    data_str = line[6:]  # Remove "data: " prefix
-                    
-                    # Check for end marker
-                    if data_str.strip() == '[DONE]':
-                        break
-                    
-                    try:
-                        # Parse JSON chunk
-                        chunk_data = json.loads(data_str)
-                        logger.debug(f"Parsed chunk: {chunk_data.keys() if isinstance(chunk_data, dict) else 'not a dict'}")
-                        
-                        # Extract content from delta
-                        if 'choices' in chunk_data and len(chunk_data['choices']) > 0:
-                            choice = chunk_data['choices'][0]
-                            if 'delta' in choice:
-                                delta = choice['delta']
-                                logger.debug(f"Delta keys: {delta.keys()}")
-                                
-                                # Handle reasoning content (if present)
-                                # NOTE: Always show reasoning for reasoning-capable models until Ramalama
-                                # adds --reasoning-budget support to properly disable it.
-                                # See: https://github.com/containers/ramalama/issues/XXX
-                                if 'reasoning_content' in delta:
-                                    reasoning_chunk = delta['reasoning_content']
-                                    if reasoning_chunk is not None and reasoning_callback:
-                                        logger.info(f"Found reasoning_content: {reasoning_chunk[:100]}...")
-                                        logger.info(f"Calling reasoning_callback with {len(reasoning_chunk)} chars")
-                                        reasoning_callback(reasoning_chunk)
-                                
-                                # Handle regular content
-                                if 'content' in delta:
-                                    content = delta['content']
-                                    logger.info(f"Found content: {repr(content)}")
-                                    # Skip null content (happens in first chunk with role assignment)
-                                    if content is not None:
-                                        full_response += content
-                                        logger.info(f"Calling chunk_callback with {len(content)} chars")
-                                        
-                                        # Call chunk callback if provided
-                                        if chunk_callback:
-                                            chunk_callback(content)
-                                        else:
-                                            logger.warning("chunk_callback is None!")
+                data = line[_SSE_DATA_LEN:]  # Remove "data: " prefix
+                
+                # Check for end marker (trailing \r already stripped by the splitter)
+                if data == _SSE_DONE:
+                    break
+                
+                try:
+                    chunk_data = loads(data)
+                except json.JSONDecodeError:
+                    # Skip invalid JSON chunks
+                    continue
+                
+                # Extract delta from the first choice
+                choices = chunk_data.get('choices')
+                if not choices:
+                    continue
+                delta = choices[0].get('delta')
+                if not delta:
+                    continue
+                
+                # Handle reasoning content (if present)
+                # NOTE: Always show reasoning for reasoning-capable models until Ramalama
+                # adds --reasoning-budget support to properly disable it.
+                # See: https://github.com/containers/ramalama/issues/XXX
+                reasoning_chunk = delta.get('reasoning_content')
+                if reasoning_chunk and reasoning_batch:
+                    debug("Queueing %d reasoning chars", len(reasoning_chunk))
+                    reasoning_batch.add(reasoning_chunk)
+                
+                # Handle regular content
+                # Skip null/empty content (first chunk carries only the role)
+                content = delta.get('content')
+                if content:
+                    append(content)
+                    debug("Queueing %d content chars", len(content))
                     
-                    except json.JSONDecodeError:
-                        # Skip invalid JSON chunks
-                        continue
+                    # Call chunk callback if provided
+                    if content_batch:
+                        if reasoning_batch:
+                            # Deliver any pending reasoning before the answer text
+                            reasoning_batch.flush()
+                        content_batch.add(content)
             
-            logger.debug(f"Streaming complete ({len(full_response)} chars)")
-            self._current_request = None
+            # Deliver whatever is still batched (also on stop, see above)
+            flush_batches()
+            
+            full_response = "".join(chunks)
+            logger.info(f"Streaming complete ({len(full_response)} chars)")
             return full_response
             
         except requests.exceptions.Timeout:
             logger.error("Ramalama API call timed out")
-            self._current_request = None
             raise Exception("Sorry, the request timed out. Please try again.")
         except requests.exceptions.ConnectionError:
+            if stopped():
+                logger.info("Streaming connection closed by stop request")
+                flush_batches()
+                return "".join(chunks)  # Return partial response
             logger.error("Cannot connect to Ramalama API")
-            self._current_request = None
             raise Exception("Cannot connect to Ramalama. Is it running? Check: systemctl --user status ramalama")
         except requests.exceptions.ChunkedEncodingError:
             # This happens when connection is closed during streaming (e.g., stop button)
             logger.info("Streaming connection closed (likely stopped by user)")
-            self._current_request = None
-            return full_response  # Return partial response
+            flush_batches()
+            return "".join(chunks)  # Return partial response
         except Exception as e:
+            if stopped():
+                # Closing the socket from another thread can surface as any I/O error
+                logger.info(f"Streaming aborted by stop request: {e}")
+                flush_batches()
+                return "".join(chunks)  # Return partial response
             logger.error(f"Error in streaming API call: {e}", exc_info=True)
-            self._current_request = None
             raise
+        finally:
+            with self._request_lock:
+                if self._current_request is response:
+                    self._current_request = None
+            if response is not None:
+                response.close()
     
     def stop_current_generation(self):
         """Stop the current streaming generation if active."""
-        if self._current_request:
+        # Signal the streaming loop first, then abort any blocking read
+        self._stop_event.set()
+        with self._request_lock:
+            request = self._current_request
+            # Always clear the request, even if close fails
+            self._current_request = None
+        
+        if request:
             try:
                 logger.info("Closing streaming connection")
                 # Close the underlying connection to immediately abort streaming
-                if hasattr(self._current_request, 'raw'):
-                    self._current_request.raw.close()
-                self._current_request.close()
+                if hasattr(request, 'raw'):
+                    request.raw.close()
+                request.close()
             except Exception as e:
                 logger.error(f"Error stopping generation: {e}")
-            finally:
-                # Always clear the request, even if close fails
-                self._current_request = None
-
-
+    
+    def close(self):
+        """Close the pooled HTTP session. Call only when tearing down the client."""
+        self.stop_current_generation()
+        self._session.close()
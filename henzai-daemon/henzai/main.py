@@ -3,90 +3,369 @@
 Main entry point for the henzai daemon service.
 """
 
+import json
+import os
+import re
+import subprocess
 import sys
+import threading
 import logging
-from gi.repository import GLib
-from .dbus_service import henzaiService
-from .llm import LLMClient
-from .memory import MemoryStore
+from logging.handlers import RotatingFileHandler
+from typing import List, Optional
 
 # Configure logging
+# The log file is size-bounded, and every record is written as it is logged
+# so `tail -f` keeps working and nothing is lost if the daemon is killed
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     handlers=[
         logging.StreamHandler(sys.stdout),
-        logging.FileHandler('/tmp/henzai-daemon.log')
+        RotatingFileHandler('/tmp/henzai-daemon.log', maxBytes=5_000_000, backupCount=3)
     ]
 )
 
 logger = logging.getLogger(__name__)
 
+RAMALAMA_UNIT = "ramalama.service"
+
+# systemd user unit search path, highest priority first
+RAMALAMA_UNIT_DIRS = [
+    os.path.expanduser("~/.config/systemd/user"),
+    "/etc/xdg/systemd/user",
+    "/etc/systemd/user",
+    "/run/systemd/user",
+    os.path.expanduser("~/.local/share/systemd/user"),
+    "/usr/local/lib/systemd/user",
+    "/usr/lib/systemd/user",
+]
+
+# Every ExecStart= assignment; systemd runs the last one, and an empty
+# assignment resets the ones before it
+_EXEC_START_RE = re.compile(r'^[ \t]*ExecStart=(.*?)[ \t]*$', re.MULTILINE)
+
+# Last argument of a `ramalama serve` command line (usually the model)
+_SERVE_MODEL_RE = re.compile(r'\bramalama\s+serve\s+.*?(\S+)$')
+
+# Markers that tell a model reference apart from a trailing option value
+_MODEL_TAG_RE = re.compile(r'ollama://|library/|:')
+
+# Persisted reasoning-support probe results, keyed by model
+REASONING_CACHE_PATH = os.path.expanduser("~/.cache/henzai/reasoning_support.json")
+
+# Model parsed from ramalama.service, keyed by the unit file's mtime
+MODEL_CACHE_PATH = os.path.expanduser("~/.cache/henzai/model.json")
+
+# Seconds between memory store maintenance runs (WAL checkpoint, vacuum)
+MAINTENANCE_INTERVAL = 60 * 60
+
+
+def _find_ramalama_unit_files() -> List[str]:
+    """
+    Locate ramalama.service and its drop-ins on disk.
+    
+    Reading the files directly avoids spawning `systemctl --user cat`
+    (and its D-Bus round trip to systemd) on every daemon start.
+    
+    Returns:
+        Path of the highest-priority unit file followed by its *.conf
+        drop-ins in the order systemd applies them, or [] if no unit
+        file was found
+    """
+    unit_path = None
+    dropins = {}
+    for directory in RAMALAMA_UNIT_DIRS:
+        path = os.path.join(directory, RAMALAMA_UNIT)
+        if unit_path is None and os.path.isfile(path):
+            unit_path = path
+        try:
+            names = os.listdir(path + ".d")
+        except OSError:
+            continue
+        for name in names:
+            if name.endswith(".conf"):
+                # A drop-in masks one of the same name in a lower-priority directory
+                dropins.setdefault(name, os.path.join(path + ".d", name))
+    if unit_path is None:
+        return []
+    return [unit_path] + [dropins[name] for name in sorted(dropins)]
+
+
+def _read_ramalama_unit_via_systemctl() -> Optional[str]:
+    """
+    Ask systemd for ramalama.service, for units outside RAMALAMA_UNIT_DIRS.
+    
+    Returns:
+        Unit file and drop-in contents, or None if systemd doesn't know the unit
+    """
+    try:
+        result = subprocess.run(
+            ['systemctl', '--user', 'cat', RAMALAMA_UNIT],
+            capture_output=True,
+            text=True,
+            timeout=2
+        )
+    except (OSError, subprocess.SubprocessError) as e:
+        logger.warning(f"Could not run systemctl --user cat: {e}")
+        return None
+    return result.stdout if result.returncode == 0 else None
+
+
+def _parse_model_from_unit(unit_text: str) -> Optional[str]:
+    """
+    Extract the served model from the ExecStart line of a unit file.
+    
+    Like systemd, the last ExecStart= assignment wins.
+    
+    Args:
+        unit_text: Unit file contents
+        
+    Returns:
+        Model string, or None if no model argument was found
+    """
+    command = None
+    for value in _EXEC_START_RE.findall(unit_text):
+        command = value or None  # An empty assignment resets ExecStart
+    if command is None:
+        return None
+    match = _SERVE_MODEL_RE.search(command)
+    if match:
+        model_arg = match.group(1)
+        if _MODEL_TAG_RE.search(model_arg):
+            return model_arg
+    return None
+
+
+def _detect_model(default: str) -> Optional[str]:
+    """
+    Read the served model from the ExecStart line of ramalama.service.
+    
+    Drop-in ExecStart overrides are applied. The parsed model is cached
+    in MODEL_CACHE_PATH keyed by the paths and mtimes of the unit and its
+    drop-ins, so steady-state starts only stat them. If the unit is not
+    in a known directory, systemd is asked for it instead.
+    
+    Args:
+        default: Model kept when detection fails (for logging)
+        
+    Returns:
+        Detected model, or None if it could not be determined
+    """
+    try:
+        unit_files = _find_ramalama_unit_files()
+        if not unit_files:
+            unit_text = _read_ramalama_unit_via_systemctl()
+            if unit_text is None:
+                logger.warning(f"Could not read ramalama.service, using default: {default}")
+                return None
+            return _parse_model_from_unit(unit_text)
+        
+        stamps = [[path, os.stat(path).st_mtime_ns] for path in unit_files]
+        cached = _load_json(MODEL_CACHE_PATH)
+        if cached.get('files') == stamps:
+            return cached.get('model')
+        
+        # Parse ExecStart lines to get the actual model being served;
+        # drop-ins come after the unit, so their assignments win
+        texts = []
+        for path in unit_files:
+            with open(path, 'r') as f:
+                texts.append(f.read())
+        detected_model = _parse_model_from_unit("\n".join(texts))
+        _save_json(MODEL_CACHE_PATH, {'files': stamps, 'model': detected_model})
+        return detected_model
+    except Exception as e:
+        logger.warning(f"Could not detect model from ramalama.service: {e}, using default: {default}")
+        return None
+
+
+def _load_json(path: str) -> dict:
+    """Load a JSON object from path, returning {} if missing or invalid."""
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_json(path: str, data: dict):
+    """Write a JSON object to path, logging (not raising) on failure."""
+    try:
+        try:
+            f = open(path, 'w')
+        except FileNotFoundError:
+            # Only the very first write needs to create the cache directory
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            f = open(path, 'w')
+        with f:
+            json.dump(data, f)
+    except OSError as e:
+        logger.warning(f"Could not write {path}: {e}")
+
+
+def _probe_startup(service, llm):
+    """
+    Detect the served model and its reasoning support on a worker thread.
+    
+    Both involve blocking I/O (unit file read, HTTP probe to Ramalama),
+    so they run off the main loop; the results are applied there by
+    _finish_init.
+    
+    Args:
+        service: Published henzai D-Bus service (status "initializing")
+        llm: LLM client to configure
+    """
+    from gi.repository import GLib
+    
+    # A SetModel call while this runs supersedes the probe's results
+    initial_model = llm.model
+    model = None
+    reasoning = None
+    try:
+        # Try to detect current model from Ramalama systemd service file
+        model = _detect_model(llm.model)
+        
+        # Probe reasoning support (HTTP round trip to Ramalama)
+        reasoning = llm.supports_reasoning(model or llm.model)
+        
+        # Warm the model list so ListModels doesn't block on `ramalama list`
+        llm.prefetch_models()
+    except Exception as e:
+        logger.error(f"Error probing startup state: {e}", exc_info=True)
+    finally:
+        GLib.idle_add(_finish_init, service, llm, initial_model, model, reasoning)
+
+
+def _finish_init(service, llm, initial_model: str, model: Optional[str],
+                 reasoning: Optional[bool]) -> bool:
+    """
+    Apply the startup probe results on the main loop and mark the service ready.
+    
+    Args:
+        service: Published henzai D-Bus service (status "initializing")
+        llm: LLM client to configure
+        initial_model: llm.model when the probe started
+        model: Detected model, or None to keep the default
+        reasoning: Whether the model supports reasoning, or None if unknown
+        
+    Returns:
+        False so GLib removes the idle source
+    """
+    if llm.model != initial_model:
+        # SetModel ran while probing and already set model and reasoning mode
+        logger.info(f"Model changed to {llm.model} during startup, ignoring probe results")
+        model = None
+        reasoning = None
+    
+    if model:
+        llm.model = model
+        logger.info(f"Detected model from ramalama.service: {model}")
+    
+    if reasoning is not None:
+        # Auto-enable reasoning when the model supports it
+        llm.reasoning_enabled = reasoning
+        if reasoning:
+            logger.info(f"Reasoning mode auto-enabled for model: {llm.model}")
+        else:
+            logger.info(f"Reasoning mode not available for model: {llm.model}")
+    
+    service.status = "ready"
+    logger.info("henzai daemon initialization complete")
+    return False
+
+
+def _run_maintenance(memory) -> bool:
+    """
+    Run memory store maintenance on a worker thread.
+    
+    Args:
+        memory: Memory store to maintain
+        
+    Returns:
+        True so the GLib timeout keeps firing
+    """
+    threading.Thread(
+        target=memory.maintenance, name="henzai-maintenance", daemon=True
+    ).start()
+    return True
+
 
 def main():
     """Main entry point for the henzai daemon."""
     logger.info("Starting henzai daemon...")
     
+    # Heavy modules (gi, dasbus, requests, sqlite3) are imported here rather
+    # than at module top so logging is live before any import work happens
+    from gi.repository import Gio, GLib
+    
+    # Open the session bus connection in the background while the memory
+    # store and LLM client initialize. dasbus gets its connection from
+    # Gio.bus_get_sync, which returns GIO's process-wide shared connection,
+    # so henzaiService reuses this one once the handshake is done.
+    threading.Thread(
+        target=Gio.bus_get_sync, args=(Gio.BusType.SESSION, None),
+        name="henzai-bus-warmup", daemon=True
+    ).start()
+    
+    from .dbus_service import henzaiService
+    from .llm import LLMClient
+    from .memory import MemoryStore
+    
+    llm = None
+    memory = None
+    
     try:
+        # dasbus talks to the bus through GDBus, which dispatches method calls
+        # and signals on the default GLib main context. Create the loop for that
+        # context up front, before anything touches the bus (no dbus-python
+        # DBusGMainLoop is involved).
+        loop = GLib.MainLoop()
+        
         # Initialize memory store
         logger.info("Initializing memory store...")
         memory = MemoryStore()
         
-        # Initialize LLM client (will auto-detect model from Ramalama)
+        # Initialize LLM client (model is detected by _probe_startup)
         logger.info("Initializing LLM client...")
-        llm = LLMClient()
+        llm = LLMClient(reasoning_cache_path=REASONING_CACHE_PATH)
         
-        # Try to detect current model from Ramalama systemd service file
-        try:
-            import subprocess
-            result = subprocess.run(
-                ['systemctl', '--user', 'cat', 'ramalama.service'],
-                capture_output=True,
-                text=True,
-                timeout=2
-            )
-            if result.returncode == 0:
-                # Parse ExecStart line to get the actual model being served
-                for line in result.stdout.split('\n'):
-                    if 'ExecStart=' in line and 'ramalama serve' in line:
-                        # Extract model from ExecStart line (last argument)
-                        parts = line.split()
-                        if len(parts) > 0:
-                            model_arg = parts[-1]  # Last argument is usually the model
-                            if 'ollama://' in model_arg or 'library/' in model_arg or ':' in model_arg:
-                                detected_model = model_arg
-                                llm.model = detected_model
-                                logger.info(f"Detected model from ramalama.service: {detected_model}")
-                                break
-            else:
-                logger.warning(f"Could not read ramalama.service, using default: {llm.model}")
-        except Exception as e:
-            logger.warning(f"Could not detect model from ramalama.service: {e}, using default: {llm.model}")
-        
-        # Auto-detect reasoning support and enable if available
-        if llm.supports_reasoning():
-            llm.reasoning_enabled = True
-            logger.info(f"Reasoning mode auto-enabled for model: {llm.model}")
-        else:
-            llm.reasoning_enabled = False
-            logger.info(f"Reasoning mode not available for model: {llm.model}")
-        
-        # Create and register D-Bus service IMMEDIATELY
-        # Don't wait for Ramalama - the GetStatus method will handle readiness checks
+        # Create and register D-Bus service before any other startup I/O,
+        # so clients never see the name unowned. GetStatus reports
+        # "initializing" until _finish_init has run.
         logger.info("Creating D-Bus service...")
         service = henzaiService(llm, memory)
+        service.status = "initializing"
         
         logger.info("henzai daemon started successfully")
         logger.info("D-Bus service available at: org.gnome.henzai")
         logger.info("Note: Ramalama may still be loading. UI will show status updates.")
         
+        # Model detection and the reasoning probe run on a worker thread so
+        # early D-Bus calls (GetStatus) are served while they complete
+        threading.Thread(
+            target=_probe_startup, args=(service, llm),
+            name="henzai-startup-probe", daemon=True
+        ).start()
+        
+        # Periodic database housekeeping, never inline with a request
+        GLib.timeout_add_seconds(MAINTENANCE_INTERVAL, _run_maintenance, memory)
+        
         # Run the main loop
-        loop = GLib.MainLoop()
         loop.run()
         
     except KeyboardInterrupt:
         logger.info("Received keyboard interrupt, shutting down...")
-        sys.exit(0)
+        # Release resources individually so one failure doesn't skip the rest
+        for resource in (llm, memory):
+            if resource is None:
+                continue
+            try:
+                resource.close()
+            except Exception as e:
+                logger.error(f"Error closing {type(resource).__name__}: {e}")
+        # Skip full interpreter finalization (gi/dasbus teardown)
+        os._exit(0)
     except Exception as e:
         logger.error(f"Fatal error: {e}", exc_info=True)
         sys.exit(1)
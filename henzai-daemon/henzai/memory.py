@@ -3,15 +3,257 @@
 Stores conversations, user preferences, and system state for persistent memory.
 """
 
+import atexit
 import logging
 import sqlite3
 import json
-from datetime import datetime
-from typing import List, Dict, Optional
+import threading
+import zlib
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Union
 import os
 
+try:
+    import orjson
+    _json_loads = orjson.loads
+    
+    def _json_dumps(obj) -> str:
+        # Columns are TEXT, so store str rather than orjson's bytes
+        return orjson.dumps(obj).decode('utf-8')
+except ImportError:  # orjson is optional, fall back to stdlib
+    _json_loads = json.loads
+    _json_dumps = json.dumps
+
 logger = logging.getLogger(__name__)
 
+# JSON payloads at least this long are stored zlib-compressed as BLOBs;
+# shorter ones stay plain JSON text so the database remains inspectable
+_COMPRESS_MIN_BYTES = 1024
+
+
+def _pack_json(obj) -> Union[str, bytes]:
+    """Encode obj for a JSON column, compressing large payloads."""
+    text = _json_dumps(obj)
+    if len(text) < _COMPRESS_MIN_BYTES:
+        return text
+    return zlib.compress(text.encode('utf-8'))
+
+
+def _unpack_json(value: Union[str, bytes]):
+    """Decode a JSON column written by _pack_json (or as plain JSON text)."""
+    if isinstance(value, bytes):
+        value = zlib.decompress(value)
+    return _json_loads(value)
+
+
+# Applied once per connection, before any schema or data access.
+# WAL + synchronous=NORMAL turns each commit into a WAL append instead of
+# a full rollback-journal fsync; foreign_keys makes ON DELETE CASCADE work.
+# auto_vacuum lets maintenance() return freed pages; it must come before
+# journal_mode, which writes the header of a new database file, and is a
+# no-op on existing databases (see _init_database).
+_CONNECTION_PRAGMAS = (
+    "PRAGMA auto_vacuum=INCREMENTAL",
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-20000",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA foreign_keys=ON",
+)
+
+# Stored in PRAGMA user_version; bump whenever _init_database changes so
+# existing databases rerun the (idempotent) schema setup once
+SCHEMA_VERSION = 3
+
+# Timestamps are INTEGER unix milliseconds: 8 bytes, compared as ints,
+# and usable in index range predicates without wrapping in datetime()
+_NOW_MS = "CAST(ROUND((julianday('now') - 2440587.5) * 86400000) AS INTEGER)"
+
+
+def _legacy_ms(column: str) -> str:
+    """SQL converting a legacy CURRENT_TIMESTAMP text column to unix ms."""
+    return f"COALESCE(CAST(strftime('%s', {column}) AS INTEGER) * 1000, {_NOW_MS})"
+
+
+def _format_ms(ms: Optional[int]) -> Optional[str]:
+    """Format a unix-ms timestamp as 'YYYY-MM-DD HH:MM:SS' (UTC)."""
+    if ms is None:
+        return None
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+
+# Table definitions, in creation order. Settings are only ever looked up
+# by key, so that table is clustered on it (WITHOUT ROWID) instead of
+# carrying a hidden rowid plus a separate primary-key index.
+_TABLES = {
+    # Sessions table - groups related conversations
+    'sessions': f'''(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT,
+        created_at INTEGER NOT NULL DEFAULT ({_NOW_MS}),
+        updated_at INTEGER NOT NULL DEFAULT ({_NOW_MS}),
+        message_count INTEGER DEFAULT 0
+    )''',
+    # Conversations table - linked to sessions
+    'conversations': f'''(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        session_id INTEGER,
+        timestamp INTEGER NOT NULL DEFAULT ({_NOW_MS}),
+        user_message TEXT NOT NULL,
+        assistant_response TEXT NOT NULL,
+        context_json TEXT,
+        FOREIGN KEY (session_id) REFERENCES sessions (id) ON DELETE CASCADE
+    )''',
+    'settings': f'''(
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL,
+        updated_at INTEGER NOT NULL DEFAULT ({_NOW_MS})
+    ) WITHOUT ROWID''',
+    # Action history table (for future learning)
+    'action_history': f'''(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp INTEGER NOT NULL DEFAULT ({_NOW_MS}),
+        action_type TEXT NOT NULL,
+        parameters TEXT,
+        outcome TEXT,
+        success BOOLEAN
+    )''',
+}
+
+# Copies rows out of a pre-version-2 table (renamed to <name>_legacy),
+# converting its CURRENT_TIMESTAMP text columns to unix ms
+_LEGACY_COPY = {
+    'sessions': f'''
+        INSERT INTO sessions (id, title, created_at, updated_at, message_count)
+        SELECT id, title, {_legacy_ms('created_at')}, {_legacy_ms('updated_at')}, message_count
+        FROM sessions_legacy
+    ''',
+    'conversations': f'''
+        INSERT INTO conversations (id, session_id, timestamp, user_message, assistant_response, context_json)
+        SELECT id, session_id, {_legacy_ms('timestamp')}, user_message, assistant_response, context_json
+        FROM conversations_legacy
+    ''',
+    'settings': f'''
+        INSERT INTO settings (key, value, updated_at)
+        SELECT key, value, {_legacy_ms('updated_at')}
+        FROM settings_legacy
+    ''',
+    'action_history': f'''
+        INSERT INTO action_history (id, timestamp, action_type, parameters, outcome, success)
+        SELECT id, {_legacy_ms('timestamp')}, action_type, parameters, outcome, success
+        FROM action_history_legacy
+    ''',
+}
+
+_INDEXES = (
+    # Composite index serves the per-session ORDER BY timestamp LIMIT
+    # queries as range scans, so SQLite doesn't sort the matched rows
+    'CREATE INDEX IF NOT EXISTS idx_conv_sess_ts ON conversations(session_id, timestamp)',
+    'CREATE INDEX IF NOT EXISTS idx_action_ts ON action_history(timestamp)',
+    # Partial index matching list_sessions' filter and ordering
+    'CREATE INDEX IF NOT EXISTS idx_sessions_updated ON sessions(updated_at) WHERE message_count > 0',
+)
+
+# Keep sessions.message_count current as turns are added or removed,
+# instead of recounting a session's rows on every save
+_TRIGGERS = (
+    f'''
+    CREATE TRIGGER conv_ai AFTER INSERT ON conversations BEGIN
+        UPDATE sessions
+        SET message_count = message_count + 1,
+            updated_at = {_NOW_MS}
+        WHERE id = NEW.session_id;
+    END
+    ''',
+    '''
+    CREATE TRIGGER conv_ad AFTER DELETE ON conversations BEGIN
+        UPDATE sessions
+        SET message_count = message_count - 1
+        WHERE id = OLD.session_id;
+    END
+    ''',
+)
+
+# Statements are kept as module constants so every call passes the same
+# SQL text and hits the connection's prepared-statement cache. Turns can
+# share a timestamp, so per-session ordering breaks ties on id.
+_SQL_INSERT_CONVERSATION = '''
+    INSERT INTO conversations (session_id, user_message, assistant_response, context_json)
+    VALUES (?, ?, ?, ?)
+'''
+# Newest turns via the index, handed back in chronological order
+_SQL_RECENT_CONTEXT = '''
+    SELECT user_message, assistant_response
+    FROM (
+        SELECT id, timestamp, user_message, assistant_response
+        FROM conversations
+        WHERE session_id = ?
+        ORDER BY timestamp DESC, id DESC
+        LIMIT ?
+    )
+    ORDER BY timestamp ASC, id ASC
+'''
+_SQL_ALL_CONVERSATIONS_LIMIT = '''
+    SELECT id, timestamp, user_message, assistant_response
+    FROM conversations
+    ORDER BY timestamp DESC
+    LIMIT ?
+'''
+_SQL_ALL_CONVERSATIONS = '''
+    SELECT id, timestamp, user_message, assistant_response
+    FROM conversations
+    ORDER BY timestamp DESC
+'''
+_SQL_INSERT_SESSION = '''
+    INSERT INTO sessions (title, message_count)
+    VALUES (?, ?)
+'''
+# Title defaults to the first user message, truncated to 50 chars
+_SQL_SAVE_SESSION = f'''
+    UPDATE sessions
+    SET title = COALESCE(
+            NULLIF(?, ''),
+            (SELECT CASE WHEN length(user_message) > 50
+                         THEN substr(user_message, 1, 50) || '...'
+                         ELSE user_message END
+             FROM conversations
+             WHERE session_id = ?
+             ORDER BY timestamp ASC, id ASC LIMIT 1),
+            'Empty Chat'),
+        updated_at = {_NOW_MS}
+    WHERE id = ?
+'''
+_SQL_LIST_SESSIONS = '''
+    SELECT id, title, created_at, updated_at, message_count
+    FROM sessions
+    WHERE message_count > 0
+    ORDER BY updated_at DESC
+    LIMIT ?
+'''
+_SQL_LOAD_SESSION = '''
+    SELECT user_message, assistant_response
+    FROM conversations
+    WHERE session_id = ?
+    ORDER BY timestamp ASC, id ASC
+'''
+_SQL_DELETE_SESSION = 'DELETE FROM sessions WHERE id = ?'
+_SQL_GET_SETTING = 'SELECT value FROM settings WHERE key = ?'
+_SQL_SET_SETTING = f'''
+    INSERT OR REPLACE INTO settings (key, value, updated_at)
+    VALUES (?, ?, {_NOW_MS})
+'''
+_SQL_INSERT_ACTION = '''
+    INSERT INTO action_history (action_type, parameters, outcome, success)
+    VALUES (?, ?, ?, ?)
+'''
+_SQL_ACTION_HISTORY = '''
+    SELECT id, timestamp, action_type, parameters, outcome, success
+    FROM action_history
+    ORDER BY timestamp DESC
+    LIMIT ?
+'''
+
 
 class MemoryStore:
     """SQLite-based storage for henzai's memory and state."""
@@ -31,97 +273,161 @@ class MemoryStore:
         
         self.db_path = db_path
         self.current_session_id = None  # Track active session
+        
+        # One connection per thread, so history reads on one thread don't
+        # queue behind a write on another (WAL lets readers run alongside
+        # the single writer). Connections are tracked per thread for close().
+        self._local = threading.local()
+        self._connections = {}
+        self._connections_lock = threading.Lock()
+        self._closed = False
+        
         logger.info(f"Initializing memory store at: {db_path}")
         
-        self.conn = sqlite3.connect(db_path, check_same_thread=False)
-        self.conn.row_factory = sqlite3.Row
+        # Schema setup runs on this thread's connection before any other
+        # thread can open one
         self._init_database()
         
-        # Create or load current session
-        self._start_new_session()
+        # The session row is created lazily by the first stored turn, so
+        # daemon starts that never chat don't write an empty session.
+        # Close (and PRAGMA optimize) even if the daemon exits without close()
+        atexit.register(self.close)
+    
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """The calling thread's database connection, opened on first use."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._open_connection()
+        return conn
+    
+    def _open_connection(self) -> sqlite3.Connection:
+        """Open and configure a connection for the calling thread."""
+        # Implicit transactions use BEGIN IMMEDIATE, so a writer takes the
+        # write lock up front instead of failing to upgrade a read lock
+        conn = sqlite3.connect(
+            self.db_path,
+            check_same_thread=False,
+            cached_statements=256,
+            isolation_level='IMMEDIATE'
+        )
+        conn.row_factory = sqlite3.Row
+        for pragma in _CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        
+        current = threading.current_thread()
+        with self._connections_lock:
+            # Streaming replies run on short-lived threads; close the
+            # connections of threads that have since exited
+            for thread in [t for t in self._connections if not t.is_alive()]:
+                self._connections.pop(thread).close()
+            self._connections[current] = conn
+        
+        self._local.conn = conn
+        return conn
     
     def _init_database(self):
-        """Initialize database schema."""
+        """Initialize database schema, unless it is already current."""
         cursor = self.conn.cursor()
         
-        # Sessions table - groups related conversations
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS sessions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                message_count INTEGER DEFAULT 0
-            )
-        ''')
-        
-        # Conversations table - now linked to sessions
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS conversations (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                session_id INTEGER,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                user_message TEXT NOT NULL,
-                assistant_response TEXT NOT NULL,
-                context_json TEXT,
-                FOREIGN KEY (session_id) REFERENCES sessions (id) ON DELETE CASCADE
-            )
-        ''')
+        cursor.execute('PRAGMA user_version')
+        version = cursor.fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            logger.debug(f"Database schema is current (version {version})")
+            return
         
-        # Create index for faster session queries
-        cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_conversations_session 
-            ON conversations(session_id)
-        ''')
+        # Rebuilding tables must neither cascade deletes nor rewrite the
+        # references of other tables; both PRAGMAs are ignored inside a
+        # transaction, so set them before BEGIN
+        cursor.execute('PRAGMA foreign_keys=OFF')
+        cursor.execute('PRAGMA legacy_alter_table=ON')
+        try:
+            cursor.execute('BEGIN IMMEDIATE')
+            
+            legacy = self._rename_legacy_tables(cursor)
+            for name, schema in _TABLES.items():
+                cursor.execute(f'CREATE TABLE IF NOT EXISTS {name} {schema}')
+            for name in legacy:
+                cursor.execute(_LEGACY_COPY[name])
+                cursor.execute(f'DROP TABLE {name}_legacy')
+            
+            cursor.execute('DROP INDEX IF EXISTS idx_conversations_session')
+            for index in _INDEXES:
+                cursor.execute(index)
+            
+            cursor.execute('DROP TRIGGER IF EXISTS conv_ai')
+            cursor.execute('DROP TRIGGER IF EXISTS conv_ad')
+            for trigger in _TRIGGERS:
+                cursor.execute(trigger)
+            
+            # Counts in older databases were only refreshed on save
+            cursor.execute('''
+                UPDATE sessions SET message_count = (
+                    SELECT COUNT(*) FROM conversations
+                    WHERE session_id = sessions.id
+                )
+            ''')
+            
+            cursor.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        finally:
+            cursor.execute('PRAGMA legacy_alter_table=OFF')
+            cursor.execute('PRAGMA foreign_keys=ON')
         
-        # Settings table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS settings (
-                key TEXT PRIMARY KEY,
-                value TEXT NOT NULL,
-                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
+        # Databases created before auto_vacuum was set on connect only
+        # switch to incremental mode when rebuilt; do that once here
+        cursor.execute('PRAGMA auto_vacuum')
+        if cursor.fetchone()[0] != 2:
+            logger.info("Rebuilding database to enable incremental vacuum")
+            cursor.execute('VACUUM')
         
-        # Action history table (for future learning)
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS action_history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                action_type TEXT NOT NULL,
-                parameters TEXT,
-                outcome TEXT,
-                success BOOLEAN
-            )
-        ''')
+        logger.info(f"Database schema initialized (version {SCHEMA_VERSION})")
+    
+    def _rename_legacy_tables(self, cursor) -> List[str]:
+        """
+        Move tables still using CURRENT_TIMESTAMP text columns aside.
         
-        self.conn.commit()
-        logger.info("Database schema initialized")
+        Returns:
+            Names of the tables renamed to <name>_legacy
+        """
+        cursor.execute("SELECT name, sql FROM sqlite_master WHERE type = 'table'")
+        legacy = [
+            row['name'] for row in cursor.fetchall()
+            if row['name'] in _TABLES and 'CURRENT_TIMESTAMP' in row['sql'].upper()
+        ]
+        for name in legacy:
+            logger.info(f"Migrating {name} table to integer timestamps")
+            cursor.execute(f'ALTER TABLE {name} RENAME TO {name}_legacy')
+        return legacy
     
     def add_conversation(self, user_message: str, assistant_response: str, context: Optional[Dict] = None):
         """
         Store a conversation turn in the current session.
         
+        Each turn is committed immediately, so a SIGTERM from systemd
+        never loses it; in WAL mode with synchronous=NORMAL a commit is
+        a cheap append to the log.
+        
         Args:
             user_message: User's message
             assistant_response: Assistant's response
             context: Optional context dictionary
         """
+        context_json = _pack_json(context) if context else None
+        if self.current_session_id is None:
+            self._start_new_session()
         try:
-            cursor = self.conn.cursor()
-            context_json = json.dumps(context) if context else None
-            
-            cursor.execute('''
-                INSERT INTO conversations (session_id, user_message, assistant_response, context_json)
-                VALUES (?, ?, ?, ?)
-            ''', (self.current_session_id, user_message, assistant_response, context_json))
-            
-            self.conn.commit()
+            with self.conn:
+                cursor = self.conn.execute(
+                    _SQL_INSERT_CONVERSATION,
+                    (self.current_session_id, user_message, assistant_response, context_json)
+                )
             logger.debug(f"Stored conversation in session {self.current_session_id} (ID: {cursor.lastrowid})")
-            
         except Exception as e:
             logger.error(f"Error storing conversation: {e}", exc_info=True)
-            self.conn.rollback()
     
     def get_recent_context(self, limit: int = 10) -> List[Dict[str, str]]:
         """
@@ -135,23 +441,13 @@ class MemoryStore:
         """
         try:
             cursor = self.conn.cursor()
-            cursor.execute('''
-                SELECT user_message, assistant_response
-                FROM conversations
-                WHERE session_id = ?
-                ORDER BY timestamp DESC
-                LIMIT ?
-            ''', (self.current_session_id, limit))
+            cursor.row_factory = None  # plain tuples on this hot path
+            cursor.execute(_SQL_RECENT_CONTEXT, (self.current_session_id, limit))
             
-            rows = cursor.fetchall()
-            
-            # Reverse to get chronological order
-            context = []
-            for row in reversed(rows):
-                context.append({
-                    'user': row['user_message'],
-                    'assistant': row['assistant_response']
-                })
+            context = [
+                {'user': user_message, 'assistant': assistant_response}
+                for user_message, assistant_response in cursor
+            ]
             
             logger.debug(f"Retrieved {len(context)} conversation turns from session {self.current_session_id}")
             return context
@@ -171,47 +467,51 @@ class MemoryStore:
             List of conversation dictionaries
         """
         try:
-            cursor = self.conn.cursor()
-            
-            if limit:
-                cursor.execute('''
-                    SELECT id, timestamp, user_message, assistant_response
-                    FROM conversations
-                    ORDER BY timestamp DESC
-                    LIMIT ?
-                ''', (limit,))
-            else:
-                cursor.execute('''
-                    SELECT id, timestamp, user_message, assistant_response
-                    FROM conversations
-                    ORDER BY timestamp DESC
-                ''')
-            
-            rows = cursor.fetchall()
-            
-            conversations = []
-            for row in rows:
-                conversations.append({
-                    'id': row['id'],
-                    'timestamp': row['timestamp'],
-                    'user_message': row['user_message'],
-                    'assistant_response': row['assistant_response']
-                })
-            
-            return conversations
-            
+            return list(self.iter_all_conversations(limit))
         except Exception as e:
             logger.error(f"Error retrieving conversations: {e}", exc_info=True)
             return []
     
+    def iter_all_conversations(self, limit: Optional[int] = None,
+                               batch_size: int = 512) -> Iterator[Dict]:
+        """
+        Iterate over all conversations, newest first.
+        
+        Rows are fetched batch_size at a time, so walking the full history
+        never holds more than one batch in memory.
+        
+        Args:
+            limit: Optional limit on number of conversations
+            batch_size: Number of rows fetched per round trip
+            
+        Yields:
+            Conversation dictionaries
+        """
+        cursor = self.conn.cursor()
+        cursor.row_factory = None  # plain tuples, unpacked below
+        cursor.arraysize = batch_size
+        if limit:
+            cursor.execute(_SQL_ALL_CONVERSATIONS_LIMIT, (limit,))
+        else:
+            cursor.execute(_SQL_ALL_CONVERSATIONS)
+        
+        while True:
+            rows = cursor.fetchmany()
+            if not rows:
+                return
+            for conversation_id, timestamp, user_message, assistant_response in rows:
+                yield {
+                    'id': conversation_id,
+                    'timestamp': _format_ms(timestamp),
+                    'user_message': user_message,
+                    'assistant_response': assistant_response
+                }
+    
     def _start_new_session(self):
         """Create a new session and set it as current."""
         try:
             cursor = self.conn.cursor()
-            cursor.execute('''
-                INSERT INTO sessions (title, message_count)
-                VALUES (?, ?)
-            ''', ("New Chat", 0))
+            cursor.execute(_SQL_INSERT_SESSION, ("New Chat", 0))
             self.conn.commit()
             self.current_session_id = cursor.lastrowid
             logger.info(f"Started new session (ID: {self.current_session_id})")
@@ -229,38 +529,11 @@ class MemoryStore:
             return
         
         try:
-            cursor = self.conn.cursor()
+            # message_count is maintained by triggers
+            with self.conn:
+                self.conn.execute(_SQL_SAVE_SESSION, (title, self.current_session_id, self.current_session_id))
             
-            # Get first user message for auto-title if not provided
-            if not title:
-                cursor.execute('''
-                    SELECT user_message FROM conversations
-                    WHERE session_id = ?
-                    ORDER BY timestamp ASC LIMIT 1
-                ''', (self.current_session_id,))
-                row = cursor.fetchone()
-                if row:
-                    # Use first 50 chars of first message
-                    title = row['user_message'][:50]
-                    if len(row['user_message']) > 50:
-                        title += "..."
-                else:
-                    title = "Empty Chat"
-            
-            # Update session title and message count
-            cursor.execute('''
-                UPDATE sessions 
-                SET title = ?,
-                    updated_at = CURRENT_TIMESTAMP,
-                    message_count = (
-                        SELECT COUNT(*) FROM conversations 
-                        WHERE session_id = ?
-                    )
-                WHERE id = ?
-            ''', (title, self.current_session_id, self.current_session_id))
-            
-            self.conn.commit()
-            logger.info(f"Saved session {self.current_session_id}: {title}")
+            logger.info(f"Saved session {self.current_session_id}")
             
         except Exception as e:
             logger.error(f"Error saving session: {e}", exc_info=True)
@@ -277,13 +550,7 @@ class MemoryStore:
         """
         try:
             cursor = self.conn.cursor()
-            cursor.execute('''
-                SELECT id, title, created_at, updated_at, message_count
-                FROM sessions
-                WHERE message_count > 0
-                ORDER BY updated_at DESC
-                LIMIT ?
-            ''', (limit,))
+            cursor.execute(_SQL_LIST_SESSIONS, (limit,))
             
             rows = cursor.fetchall()
             sessions = []
@@ -291,8 +558,8 @@ class MemoryStore:
                 sessions.append({
                     'id': row['id'],
                     'title': row['title'] or "Untitled Chat",
-                    'created_at': row['created_at'],
-                    'updated_at': row['updated_at'],
+                    'created_at': _format_ms(row['created_at']),
+                    'updated_at': _format_ms(row['updated_at']),
                     'message_count': row['message_count']
                 })
             
@@ -314,19 +581,14 @@ class MemoryStore:
         """
         try:
             cursor = self.conn.cursor()
-            cursor.execute('''
-                SELECT user_message, assistant_response
-                FROM conversations
-                WHERE session_id = ?
-                ORDER BY timestamp ASC
-            ''', (session_id,))
+            cursor.row_factory = None  # plain tuples, unpacked below
+            cursor.execute(_SQL_LOAD_SESSION, (session_id,))
             
-            rows = cursor.fetchall()
             context = []
-            for row in rows:
+            for user_message, assistant_response in cursor:
                 context.append({
-                    'user': row['user_message'],
-                    'assistant': row['assistant_response']
+                    'user': user_message,
+                    'assistant': assistant_response
                 })
             
             # Set as current session
@@ -347,14 +609,14 @@ class MemoryStore:
         """
         try:
             cursor = self.conn.cursor()
-            cursor.execute('DELETE FROM sessions WHERE id = ?', (session_id,))
+            cursor.execute(_SQL_DELETE_SESSION, (session_id,))
             # Conversations cascade delete automatically
             self.conn.commit()
             logger.info(f"Deleted session {session_id}")
             
-            # If deleted current session, start new one
+            # If deleted current session, the next turn starts a new one
             if session_id == self.current_session_id:
-                self._start_new_session()
+                self.current_session_id = None
                 
         except Exception as e:
             logger.error(f"Error deleting session: {e}", exc_info=True)
@@ -367,8 +629,8 @@ class MemoryStore:
             if self.current_session_id:
                 self.save_current_session()
             
-            # Start new session
-            self._start_new_session()
+            # Start new session (created on the next stored turn)
+            self.current_session_id = None
             logger.info("Started new session (history preserved)")
         except Exception as e:
             logger.error(f"Error clearing history: {e}", exc_info=True)
@@ -386,7 +648,7 @@ class MemoryStore:
         """
         try:
             cursor = self.conn.cursor()
-            cursor.execute('SELECT value FROM settings WHERE key = ?', (key,))
+            cursor.execute(_SQL_GET_SETTING, (key,))
             row = cursor.fetchone()
             
             if row:
@@ -407,10 +669,7 @@ class MemoryStore:
         """
         try:
             cursor = self.conn.cursor()
-            cursor.execute('''
-                INSERT OR REPLACE INTO settings (key, value, updated_at)
-                VALUES (?, ?, CURRENT_TIMESTAMP)
-            ''', (key, value))
+            cursor.execute(_SQL_SET_SETTING, (key, value))
             
             self.conn.commit()
             logger.debug(f"Set setting: {key} = {value}")
@@ -431,12 +690,9 @@ class MemoryStore:
         """
         try:
             cursor = self.conn.cursor()
-            parameters_json = json.dumps(parameters)
+            parameters_json = _pack_json(parameters)
             
-            cursor.execute('''
-                INSERT INTO action_history (action_type, parameters, outcome, success)
-                VALUES (?, ?, ?, ?)
-            ''', (action_type, parameters_json, outcome, success))
+            cursor.execute(_SQL_INSERT_ACTION, (action_type, parameters_json, outcome, 1 if success else 0))
             
             self.conn.commit()
             logger.debug(f"Logged action: {action_type}")
@@ -457,24 +713,18 @@ class MemoryStore:
         """
         try:
             cursor = self.conn.cursor()
-            cursor.execute('''
-                SELECT id, timestamp, action_type, parameters, outcome, success
-                FROM action_history
-                ORDER BY timestamp DESC
-                LIMIT ?
-            ''', (limit,))
-            
-            rows = cursor.fetchall()
+            cursor.row_factory = None  # plain tuples, unpacked below
+            cursor.execute(_SQL_ACTION_HISTORY, (limit,))
             
             actions = []
-            for row in rows:
+            for action_id, timestamp, action_type, parameters, outcome, success in cursor:
                 actions.append({
-                    'id': row['id'],
-                    'timestamp': row['timestamp'],
-                    'action_type': row['action_type'],
-                    'parameters': json.loads(row['parameters']) if row['parameters'] else {},
-                    'outcome': row['outcome'],
-                    'success': bool(row['success'])
+                    'id': action_id,
+                    'timestamp': _format_ms(timestamp),
+                    'action_type': action_type,
+                    'parameters': _unpack_json(parameters) if parameters else {},
+                    'outcome': outcome,
+                    'success': success == 1
                 })
             
             return actions
@@ -483,15 +733,50 @@ class MemoryStore:
             logger.error(f"Error retrieving action history: {e}", exc_info=True)
             return []
     
+    def maintenance(self):
+        """
+        Checkpoint the WAL and reclaim free pages.
+        
+        Keeps the -wal file from growing without bound and returns pages
+        freed by deleted sessions. Meant to be called periodically by the
+        daemon, off the D-Bus request path.
+        """
+        try:
+            conn = self.conn
+            conn.execute('PRAGMA incremental_vacuum').fetchall()
+            conn.execute('PRAGMA optimize')
+            # Last, so the pages written above are checkpointed too
+            conn.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchall()
+            logger.info("Memory store maintenance complete")
+        except sqlite3.Error as e:
+            logger.warning(f"Memory store maintenance failed: {e}")
+    
     def close(self):
-        """Close the database connection."""
-        if self.conn:
-            self.conn.close()
+        """Close all database connections."""
+        if self._closed:
+            return
+        self._closed = True
+        with self._connections_lock:
+            connections = list(self._connections.values())
+            self._connections.clear()
+        self._local = threading.local()
+        
+        for conn in connections:
+            try:
+                # Refresh planner statistics for tables whose indexes changed
+                conn.execute('PRAGMA optimize')
+            except sqlite3.Error as e:
+                logger.warning(f"PRAGMA optimize failed: {e}")
+            conn.close()
+        if connections:
             logger.info("Database connection closed")
     
-    def __del__(self):
-        """Cleanup on deletion."""
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
         self.close()
+        return False
 
 
 
@@ -3,23 +3,167 @@
 Implements all system-level actions that the AI can perform.
 """
 
+import functools
 import logging
-import subprocess
 import os
-from typing import Any, Dict
+import platform
+import re
+import shlex
+import subprocess
+import unicodedata
+from typing import Any, Dict, List, Optional, Tuple
 import gi
 
 gi.require_version('Gio', '2.0')
-from gi.repository import Gio
+from gi.repository import Gio, GLib
 
 logger = logging.getLogger(__name__)
 
 
+def _parse_setting_value(value_type: GLib.VariantType, value: str) -> GLib.Variant:
+    """
+    Parse a setting value the way the gsettings CLI does.
+    
+    The value is parsed as GVariant text of the key's type; for string keys
+    an unquoted value (e.g. prefer-dark) is taken literally.
+    
+    Args:
+        value_type: Type of the settings key
+        value: Value in GVariant text format
+        
+    Returns:
+        Parsed value
+        
+    Raises:
+        Exception: If the value does not parse as the key's type
+    """
+    try:
+        return GLib.Variant.parse(value_type, value, None, None)
+    except GLib.Error:
+        if value_type.equal(GLib.VariantType.new('s')):
+            return GLib.Variant('s', value)
+        raise Exception(f"Invalid value for type {value_type.dup_string()}: {value}")
+
+
+# Programs execute_command may run (looked up in PATH, never by path)
+ALLOWED_COMMANDS = frozenset({
+    'brightnessctl',
+    'date',
+    'df',
+    'free',
+    'gio',
+    'gnome-extensions',
+    'hostname',
+    'nmcli',
+    'notify-send',
+    'pactl',
+    'playerctl',
+    'systemctl',
+    'uname',
+    'uptime',
+    'wl-copy',
+    'wl-paste',
+    'wpctl',
+    'xdg-open',
+})
+
+# Programs that can also change or delete state are limited to these
+# read-only (or harmless) subcommands, e.g. no `gio remove` or
+# `systemctl poweroff`. Multi-word entries must match word for word.
+ALLOWED_SUBCOMMANDS = {
+    'gio': frozenset({'info', 'list', 'open', 'tree'}),
+    'gnome-extensions': frozenset({'info', 'list', 'show', 'version'}),
+    'nmcli': frozenset({'general status', 'device status', 'device show',
+                        'device wifi list', 'connection show'}),
+    'systemctl': frozenset({'is-active', 'is-enabled', 'is-failed', 'list-timers',
+                            'list-unit-files', 'list-units', 'show', 'status'}),
+}
+
+# Options allowed before the subcommand. None of them takes a value, so
+# no option argument can stand in for the subcommand.
+_LEADING_FLAGS = {
+    'nmcli': frozenset({'-t', '--terse', '-p', '--pretty'}),
+    'systemctl': frozenset({'--user', '--no-pager', '--no-legend', '--full', '-l'}),
+}
+
+_DANGEROUS_COMMAND_RE = re.compile(r'rm -rf /|mkfs|dd if=|> ?/dev/|chmod 777|chown root')
+
+
+def _check_subcommand(argv: List[str]):
+    """
+    Reject commands whose subcommand is not in ALLOWED_SUBCOMMANDS.
+    
+    The subcommand must come right after the program name, or after
+    options from _LEADING_FLAGS; any other option before it is rejected.
+    
+    Args:
+        argv: Command line, argv[0] already checked against ALLOWED_COMMANDS
+        
+    Raises:
+        Exception: If the subcommand is missing or not allowed
+    """
+    subcommands = ALLOWED_SUBCOMMANDS.get(argv[0])
+    if subcommands is None:
+        return
+    leading_flags = _LEADING_FLAGS.get(argv[0], frozenset())
+    rest = argv[1:]
+    while rest and rest[0] in leading_flags:
+        rest = rest[1:]
+    if rest and rest[0].startswith('-'):
+        raise Exception(f"Option not allowed before the subcommand: {argv[0]} {rest[0]}")
+    for subcommand in subcommands:
+        words = subcommand.split()
+        if rest[:len(words)] == words:
+            return
+    raise Exception(f"Command not allowed: {' '.join(argv[:1] + rest[:3])}")
+
+
+@functools.lru_cache(maxsize=None)
+def _os_name() -> str:
+    """Return the OS pretty name; it can't change while the daemon runs."""
+    try:
+        return platform.freedesktop_os_release().get('PRETTY_NAME', "Unknown Linux")
+    except OSError:
+        return "Unknown Linux"
+
+
+def _normalize_app_name(name: str) -> str:
+    """Case-fold and strip accents, so "Éditeur" matches "editeur"."""
+    decomposed = unicodedata.normalize('NFKD', name)
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def _application_dirs() -> List[str]:
+    """Return the XDG applications directories, user directory first."""
+    data_dirs = [GLib.get_user_data_dir()] + list(GLib.get_system_data_dirs())
+    return [os.path.join(data_dir, 'applications') for data_dir in data_dirs]
+
+
+def _mtime_ns(path: str) -> int:
+    """Return path's mtime in nanoseconds, or 0 if it doesn't exist."""
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return 0
+
+
 class ToolExecutor:
     """Executes system actions based on tool calls from the LLM."""
     
     def __init__(self):
         """Initialize the tool executor."""
+        # Gio.Settings objects by schema id, reused across adjust_setting calls
+        self._settings_cache: Dict[str, Gio.Settings] = {}
+        
+        # Installed applications, refreshed when an applications dir changes
+        self._app_cache: Optional[List[Gio.AppInfo]] = None
+        self._app_cache_stamp: Tuple[int, ...] = ()
+        self._app_index: Dict[str, List[Gio.AppInfo]] = {}
+        self._app_names: List[Tuple[str, Gio.AppInfo]] = []
+        
+        # /proc/uptime descriptor, opened on first use
+        self._uptime_fd: Optional[int] = None
+        
         logger.info("Tool executor initialized")
     
     def execute(self, tool_name: str, parameters: Dict[str, Any]) -> str:
@@ -57,6 +201,64 @@ class ToolExecutor:
             logger.error(f"Tool {tool_name} failed: {e}", exc_info=True)
             raise
     
+    def _get_all_apps(self) -> List[Gio.AppInfo]:
+        """
+        Get installed applications, reusing the last scan when possible.
+        
+        Gio.AppInfo.get_all() parses every .desktop file, so the result is
+        kept until the mtime of one of the XDG applications directories
+        changes (i.e. a desktop file was added, removed or renamed).
+        
+        Returns:
+            List of installed applications
+        """
+        stamp = tuple(_mtime_ns(path) for path in _application_dirs())
+        if self._app_cache is None or stamp != self._app_cache_stamp:
+            apps = Gio.AppInfo.get_all()
+            self._index_apps(apps)
+            self._app_cache = apps
+            self._app_cache_stamp = stamp
+            logger.debug(f"Cached {len(apps)} installed applications")
+        return self._app_cache
+    
+    def _index_apps(self, apps: List[Gio.AppInfo]):
+        """
+        Build the lookup tables used by launch_app.
+        
+        _app_index maps normalized full names, desktop ids (with and without
+        reverse-DNS prefix) and individual name words to applications. Full
+        names and ids are indexed first, so they win over word matches.
+        _app_names keeps each app's normalized names for substring fallback.
+        """
+        index: Dict[str, List[Gio.AppInfo]] = {}
+        names = []
+        tokens = []
+        
+        def add(key, app):
+            apps_for_key = index.setdefault(key, [])
+            if app not in apps_for_key:
+                apps_for_key.append(app)
+        
+        for app in apps:
+            app_names = [_normalize_app_name(n) for n in (app.get_name(), app.get_display_name()) if n]
+            names.append((' '.join(app_names), app))
+            
+            for name in app_names:
+                add(name, app)
+                tokens.extend((token, app) for token in name.split())
+            
+            app_id = app.get_id()
+            if app_id:
+                app_id = _normalize_app_name(app_id.removesuffix('.desktop'))
+                add(app_id, app)
+                add(app_id.rpartition('.')[2], app)
+        
+        for token, app in tokens:
+            add(token, app)
+        
+        self._app_index = index
+        self._app_names = names
+    
     def launch_app(self, app_name: str) -> str:
         """
         Launch a GNOME application.
@@ -91,18 +293,20 @@ class ToolExecutor:
                     if app_info:
                         break
             
-            # If still not found, search all apps
+            # If still not found, look the name up in the app index
             if not app_info:
-                all_apps = Gio.AppInfo.get_all()
-                app_name_lower = app_name.lower()
+                self._get_all_apps()
+                query = _normalize_app_name(app_name)
+                candidates = self._app_index.get(query)
+                if candidates:
+                    app_info = candidates[0]
                 
-                for app in all_apps:
-                    name = app.get_name().lower()
-                    display_name = app.get_display_name().lower()
-                    
-                    if app_name_lower in name or app_name_lower in display_name:
-                        app_info = app
-                        break
+                # Then fall back to a substring match
+                if not app_info:
+                    for names, app in self._app_names:
+                        if query in names:
+                            app_info = app
+                            break
             
             if not app_info:
                 return f"Could not find application: {app_name}"
@@ -122,12 +326,12 @@ class ToolExecutor:
     
     def adjust_setting(self, schema: str, key: str, value: str) -> str:
         """
-        Change a GNOME system setting using gsettings.
+        Change a GNOME system setting through GSettings.
         
         Args:
             schema: GSettings schema (e.g., "org.gnome.desktop.interface")
             key: Setting key (e.g., "color-scheme", "gtk-theme")
-            value: New value for the setting
+            value: New value for the setting, as accepted by `gsettings set`
             
         Returns:
             Success message
@@ -136,34 +340,62 @@ class ToolExecutor:
             Exception: If setting cannot be changed
         """
         try:
-            # Use gsettings command
-            result = subprocess.run(
-                ['gsettings', 'set', schema, key, value],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
+            settings = self._get_settings(schema)
+            settings_schema = settings.props.settings_schema
+            if not settings_schema.has_key(key):
+                raise Exception(f"No such key: {key}")
             
-            if result.returncode != 0:
-                error = result.stderr or "Unknown error"
-                raise Exception(f"gsettings error: {error}")
+            schema_key = settings_schema.get_key(key)
+            variant = _parse_setting_value(schema_key.get_value_type(), value)
+            if not schema_key.range_check(variant):
+                raise Exception(f"Value out of range for {key}: {value}")
+            
+            if not settings.set_value(key, variant):
+                raise Exception(f"Key is not writable: {key}")
+            # Flush to dconf before reporting success
+            Gio.Settings.sync()
             
             return f"Set {schema} {key} to {value}"
             
-        except subprocess.TimeoutExpired:
-            raise Exception("Setting change timed out")
-        except FileNotFoundError:
-            raise Exception("gsettings command not found")
         except Exception as e:
             logger.error(f"Error adjusting setting: {e}", exc_info=True)
             raise Exception(f"Failed to adjust setting: {str(e)}")
     
+    def _get_settings(self, schema: str) -> Gio.Settings:
+        """
+        Get a (cached) Gio.Settings object for a schema.
+        
+        Args:
+            schema: GSettings schema id
+            
+        Returns:
+            Settings object for the schema
+            
+        Raises:
+            Exception: If the schema is not installed
+        """
+        settings = self._settings_cache.get(schema)
+        if settings is None:
+            # Gio.Settings.new() aborts the process on an unknown schema,
+            # so look it up first
+            source = Gio.SettingsSchemaSource.get_default()
+            settings_schema = source.lookup(schema, True) if source else None
+            if settings_schema is None:
+                raise Exception(f"No such schema: {schema}")
+            settings = Gio.Settings.new_full(settings_schema, None, None)
+            self._settings_cache[schema] = settings
+        return settings
+    
     def execute_command(self, command: str) -> str:
         """
-        Execute a shell command (with safety restrictions).
+        Execute a command (with safety restrictions).
+        
+        The command is split with shell quoting rules and run without a
+        shell; only programs in ALLOWED_COMMANDS may be executed, and
+        programs listed in ALLOWED_SUBCOMMANDS only with those subcommands.
         
         Args:
-            command: Shell command to execute
+            command: Command line to execute
             
         Returns:
             Command output
@@ -171,24 +403,27 @@ class ToolExecutor:
         Raises:
             Exception: If command execution fails or is unsafe
         """
-        # Safety check: block potentially dangerous commands
-        dangerous_patterns = [
-            'rm -rf /',
-            'mkfs',
-            'dd if=',
-            '> /dev/',
-            'chmod 777',
-            'chown root',
-        ]
+        # Belt and braces: block known-dangerous patterns regardless of case
+        # or spacing, even though the allowlist below already excludes them
+        if _DANGEROUS_COMMAND_RE.search(re.sub(r'\s+', ' ', command.lower())):
+            raise Exception(f"Dangerous command blocked: {command}")
+        
+        try:
+            argv = shlex.split(command)
+        except ValueError as e:
+            raise Exception(f"Invalid command: {e}")
         
-        for pattern in dangerous_patterns:
-            if pattern in command.lower():
-                raise Exception(f"Dangerous command blocked: {command}")
+        if not argv:
+            raise Exception("Empty command")
+        if '/' in argv[0] or argv[0] not in ALLOWED_COMMANDS:
+            raise Exception(f"Command not allowed: {argv[0]}")
+        _check_subcommand(argv)
         
         try:
+            # No shell: argv is executed directly, so pipes, redirects and
+            # command chaining are not interpreted
             result = subprocess.run(
-                command,
-                shell=True,
+                argv,
                 capture_output=True,
                 text=True,
                 timeout=10
@@ -207,6 +442,12 @@ class ToolExecutor:
             logger.error(f"Error executing command: {e}", exc_info=True)
             raise Exception(f"Failed to execute command: {str(e)}")
     
+    def _read_uptime(self) -> bytes:
+        """Read /proc/uptime through a descriptor kept open across calls."""
+        if self._uptime_fd is None:
+            self._uptime_fd = os.open('/proc/uptime', os.O_RDONLY | os.O_CLOEXEC)
+        return os.pread(self._uptime_fd, 64, 0)
+    
     def get_system_info(self) -> str:
         """
         Get information about the system.
@@ -218,15 +459,7 @@ class ToolExecutor:
             info_parts = []
             
             # OS information
-            try:
-                with open('/etc/os-release', 'r') as f:
-                    for line in f:
-                        if line.startswith('PRETTY_NAME='):
-                            os_name = line.split('=')[1].strip().strip('"')
-                            info_parts.append(f"OS: {os_name}")
-                            break
-            except:
-                info_parts.append("OS: Unknown Linux")
+            info_parts.append(f"OS: {_os_name()}")
             
             # Desktop session
             desktop = os.environ.get('DESKTOP_SESSION', 'unknown')
@@ -234,7 +467,7 @@ class ToolExecutor:
             
             # Currently running apps
             try:
-                all_apps = Gio.AppInfo.get_all()
+                all_apps = self._get_all_apps()
                 # This is a simplified approach - in reality, you'd need to query
                 # the window manager for actually running apps
                 info_parts.append(f"Installed applications: {len(all_apps)}")
@@ -243,10 +476,9 @@ class ToolExecutor:
             
             # Uptime
             try:
-                with open('/proc/uptime', 'r') as f:
-                    uptime_seconds = float(f.read().split()[0])
-                    uptime_hours = int(uptime_seconds / 3600)
-                    info_parts.append(f"System uptime: {uptime_hours} hours")
+                uptime_seconds = float(self._read_uptime().split(b' ', 1)[0])
+                uptime_hours = int(uptime_seconds / 3600)
+                info_parts.append(f"System uptime: {uptime_hours} hours")
             except:
                 pass
             
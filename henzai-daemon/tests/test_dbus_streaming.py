@@ -42,7 +42,7 @@ class TestDBusStreamingLogic:
     def test_service_initializes_with_stop_flag(self, dbus_service):
         """Test that service initializes with stop generation flag."""
         assert hasattr(dbus_service, '_stop_generation')
-        assert dbus_service._stop_generation is False
+        assert not dbus_service._stop_generation.is_set()
     
     def test_send_message_streaming_calls_llm(self, dbus_service, mock_llm, mock_memory):
         """Test that streaming message calls LLM with correct parameters."""
@@ -117,7 +117,7 @@ class TestDBusStreamingLogic:
         result = dbus_service.StopGeneration()
         
         assert result is True
-        assert dbus_service._stop_generation is True
+        assert dbus_service._stop_generation.is_set()
         assert dbus_service.status == "ready"
         mock_llm.stop_current_generation.assert_called_once()
     
@@ -125,7 +125,7 @@ class TestDBusStreamingLogic:
         """Test that stop flag causes early return."""
         def mock_stream(message, context, chunk_callback):
             # Simulate stop during streaming
-            dbus_service._stop_generation = True
+            dbus_service._stop_generation.set()
             return "Partial"
         
         mock_llm.generate_response_streaming.side_effect = mock_stream
@@ -137,7 +137,7 @@ class TestDBusStreamingLogic:
     
     def test_stop_flag_resets_on_new_message(self, dbus_service, mock_llm):
         """Test that new message resets stop flag."""
-        dbus_service._stop_generation = True
+        dbus_service._stop_generation.set()
         mock_llm.generate_response_streaming.return_value = "Response"
         
         dbus_service.SendMessageStreaming("New message")
@@ -219,3 +219,23 @@ class TestDBusStreamingIntegration:
         result2 = dbus_service.SendMessageStreaming("Second")
         assert result2 == "OK"
         assert dbus_service.status == "ready"
+    
+    def test_regenerate_bypasses_response_cache(self, dbus_service, mock_llm):
+        """Test that RegenerateStreaming asks the LLM not to replay a cached reply."""
+        mock_llm.generate_response_streaming.return_value = "Fresh"
+        
+        # Run the background generation inline
+        with patch('threading.Thread') as mock_thread:
+            mock_thread.side_effect = lambda target, daemon: Mock(start=target)
+            dbus_service.RegenerateStreaming("Again")
+            dbus_service.SendMessageStreaming("Again")
+        
+        calls = mock_llm.generate_response_streaming.call_args_list
+        assert calls[0].kwargs['use_cache'] is False
+        assert calls[1].kwargs['use_cache'] is True
+    
+    def test_new_conversation_clears_response_cache(self, dbus_service, mock_llm):
+        """Test that starting over drops cached replies."""
+        dbus_service.NewConversation()
+        
+        mock_llm.clear_response_cache.assert_called_once()
@@ -0,0 +1,83 @@
+"""Tests for LLM client model listing."""
+
+import json
+import subprocess
+import pytest
+from unittest.mock import Mock, patch
+
+from henzai.llm import LLMClient
+
+
+@pytest.fixture
+def llm_client():
+    """Create an LLM client for testing."""
+    return LLMClient(model="test-model", api_url="http://test:8080")
+
+
+def completed(stdout, returncode=0):
+    """Build a finished subprocess result."""
+    return subprocess.CompletedProcess(args=[], returncode=returncode, stdout=stdout, stderr="")
+
+
+class TestListAvailableModels:
+    """Test `ramalama list` parsing and caching."""
+    
+    @patch('henzai.llm.subprocess.run')
+    def test_parses_json_output(self, mock_run, llm_client):
+        """Test that `ramalama list --json` output is used when available."""
+        mock_run.return_value = completed(json.dumps([
+            {"name": "ollama://library/deepseek-r1:14b", "modified": "2025-01-01", "size": 8987101184},
+        ]))
+        
+        models = llm_client.list_available_models()
+        
+        assert mock_run.call_args[0][0] == ['ramalama', 'list', '--json']
+        assert models[0]['id'] == "ollama://library/deepseek-r1:14b"
+        assert models[0]['name'] == "deepseek-r1:14b"
+        assert models[0]['size'] == 8987101184
+        assert models[0]['size_str'] == "8.37 GB"
+    
+    @patch('henzai.llm.subprocess.run')
+    def test_falls_back_to_table_output(self, mock_run, llm_client):
+        """Test that older ramalama without --json is still parsed."""
+        mock_run.side_effect = [
+            completed("", returncode=2),
+            completed("NAME MODIFIED SIZE\n"
+                      "ollama://library/llama3.2:latest    2 hours ago 1.88 GB\n"),
+        ]
+        
+        models = llm_client.list_available_models()
+        
+        assert len(models) == 1
+        assert models[0]['id'] == "ollama://library/llama3.2:latest"
+        assert models[0]['size_str'] == "1.88 GB"
+        assert models[0]['size'] == int(1.88 * 1024 ** 3)
+    
+    @patch('henzai.llm.subprocess.run')
+    def test_result_is_cached(self, mock_run, llm_client):
+        """Test that repeated calls within the TTL reuse the cached list."""
+        mock_run.return_value = completed(json.dumps([{"name": "llama3.2", "size": 1024}]))
+        
+        first = llm_client.list_available_models()
+        second = llm_client.list_available_models()
+        
+        assert first == second
+        assert mock_run.call_count == 1
+        
+        # Expired cache is served immediately and refreshed in the background
+        llm_client._models_cache = (0.0, first)
+        with patch('henzai.llm.time.monotonic', return_value=llm_client._MODELS_TTL + 1):
+            assert llm_client.list_available_models() == first
+            llm_client._models_thread.join(timeout=5)
+        assert mock_run.call_count == 2
+    
+    @patch('henzai.llm.subprocess.run')
+    def test_prefetch_warms_cache(self, mock_run, llm_client):
+        """Test that prefetching fills the cache without blocking the caller."""
+        mock_run.return_value = completed(json.dumps([{"name": "llama3.2", "size": 1024}]))
+        
+        llm_client.prefetch_models()
+        llm_client._models_thread.join(timeout=5)
+        
+        assert llm_client.list_available_models()[0]['id'] == "llama3.2"
+        assert mock_run.call_count == 1
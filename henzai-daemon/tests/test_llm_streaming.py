@@ -2,12 +2,51 @@
 
 import pytest
 import json
+import time
 from unittest.mock import Mock, patch, MagicMock
 from io import BytesIO
 
 from henzai.llm import LLMClient
 
 
+def _sse_line(content):
+    """Encode one chat completion delta as an SSE data line."""
+    return b'data: ' + json.dumps({"choices": [{"delta": {"content": content}}]}).encode() + b'\n'
+
+
+class _FakeResponse:
+    """Plain stand-in for a streaming requests.Response."""
+    
+    def __init__(self, chunks, status_code=200):
+        self.status_code = status_code
+        self.text = ""
+        self.closed = False
+        self._chunks = chunks
+    
+    def iter_content(self, chunk_size=None):
+        return iter(self._chunks)
+    
+    def json(self):
+        return {}
+    
+    def close(self):
+        self.closed = True
+
+
+def _sse_response(*contents, raw=None, status_code=200):
+    """
+    Build a fake streaming response.
+    
+    Args:
+        contents: Delta contents, sent in order and followed by [DONE]
+        raw: Network chunks to send verbatim instead of contents
+        status_code: HTTP status of the response
+    """
+    if raw is None:
+        raw = [_sse_line(content) for content in contents] + [b'data: [DONE]\n']
+    return _FakeResponse(raw, status_code)
+
+
 @pytest.fixture
 def llm_client():
     """Create an LLM client for testing."""
@@ -23,22 +62,70 @@ class TestLLMStreaming:
         assert llm_client.api_url == "http://test:8080"
         assert llm_client._current_request is None
     
-    @patch('henzai.llm.requests.post')
+    @patch('henzai.llm.requests.Session.get')
+    def test_supports_reasoning_is_cached_per_model(self, mock_get, llm_client):
+        """Test that the reasoning probe only hits the API once per model."""
+        mock_get.return_value = Mock(status_code=200, json=Mock(return_value={'models': []}))
+        
+        assert llm_client.supports_reasoning() is False
+        assert llm_client.supports_reasoning() is False
+        assert mock_get.call_count == 1
+        
+        # Switching model triggers a fresh probe
+        llm_client.model = "deepseek-r1:14b"
+        assert llm_client.supports_reasoning() is True
+        assert mock_get.call_count == 2
+    
+    @patch('henzai.llm.requests.Session.get')
+    def test_reasoning_cache_persists_across_clients(self, mock_get, tmp_path):
+        """Test that probe results are reloaded from the cache file."""
+        mock_get.return_value = Mock(status_code=200, json=Mock(return_value={'models': []}))
+        cache_path = str(tmp_path / "henzai" / "reasoning_support.json")
+        
+        first = LLMClient(model="deepseek-r1:14b", reasoning_cache_path=cache_path)
+        assert first.supports_reasoning() is True
+        assert mock_get.call_count == 1
+        
+        second = LLMClient(model="deepseek-r1:14b", reasoning_cache_path=cache_path)
+        assert second.supports_reasoning() is True
+        assert mock_get.call_count == 1
+    
+    @patch('henzai.llm.requests.Session.get')
+    def test_failed_reasoning_probe_is_not_cached(self, mock_get, tmp_path):
+        """Test that a pattern guess made while Ramalama is down is not persisted."""
+        import requests
+        mock_get.side_effect = requests.exceptions.ConnectionError()
+        cache_path = tmp_path / "reasoning_support.json"
+        
+        client = LLMClient(model="deepseek-r1:14b", reasoning_cache_path=str(cache_path))
+        assert client.supports_reasoning() is True
+        assert not cache_path.exists()
+        
+        # Once Ramalama answers, the probe runs again and its result sticks
+        mock_get.side_effect = None
+        mock_get.return_value = Mock(status_code=200, json=Mock(return_value={'models': []}))
+        assert client.supports_reasoning() is True
+        assert mock_get.call_count == 2
+        assert cache_path.exists()
+    
+    @patch('henzai.llm.requests.Session.get')
+    @patch('henzai.llm.requests.Session.post')
+    def test_reasoning_disabled_skips_probe(self, mock_post, mock_get, llm_client):
+        """Test that no reasoning probe is made when reasoning is disabled."""
+        mock_post.return_value = _sse_response()
+        
+        llm_client.reasoning_enabled = False
+        llm_client._call_ramalama_api_streaming([{"role": "user", "content": "test"}], None)
+        
+        assert not mock_get.called
+        payload = json.loads(mock_post.call_args[1]['data'])
+        assert payload['temperature'] == 0.7
+        assert 'reasoning' not in payload
+    
+    @patch('henzai.llm.requests.Session.post')
     def test_streaming_api_call_success(self, mock_post, llm_client):
         """Test successful streaming API call."""
-        # Create mock streaming response
-        mock_response = Mock()
-        mock_response.status_code = 200
-        
-        # Simulate SSE stream
-        sse_data = [
-            b'data: {"choices":[{"delta":{"content":"Hello"}}]}\n',
-            b'data: {"choices":[{"delta":{"content":" world"}}]}\n',
-            b'data: {"choices":[{"delta":{"content":"!"}}]}\n',
-            b'data: [DONE]\n',
-        ]
-        mock_response.iter_lines.return_value = sse_data
-        mock_post.return_value = mock_response
+        mock_post.return_value = _sse_response("Hello", " world", "!")
         
         # Track chunks
         chunks = []
@@ -57,42 +144,31 @@ class TestLLMStreaming:
         
         # Check request payload
         call_args = mock_post.call_args
-        payload = call_args[1]['json']
+        payload = json.loads(call_args[1]['data'])
         assert payload['stream'] is True
         assert payload['model'] == "test-model"
         assert payload['messages'] == messages
     
-    @patch('henzai.llm.requests.post')
+    @patch('henzai.llm.requests.Session.post')
     def test_streaming_with_no_callback(self, mock_post, llm_client):
         """Test streaming works without callback."""
-        mock_response = Mock()
-        mock_response.status_code = 200
-        
-        sse_data = [
-            b'data: {"choices":[{"delta":{"content":"Test"}}]}\n',
-            b'data: [DONE]\n',
-        ]
-        mock_response.iter_lines.return_value = sse_data
-        mock_post.return_value = mock_response
+        mock_post.return_value = _sse_response("Test")
         
         messages = [{"role": "user", "content": "test"}]
         result = llm_client._call_ramalama_api_streaming(messages, None)
         
         assert result == "Test"
     
-    @patch('henzai.llm.requests.post')
-    def test_streaming_handles_empty_content(self, mock_post, llm_client):
-        """Test that streaming handles chunks with empty content."""
-        mock_response = Mock()
-        mock_response.status_code = 200
-        
-        sse_data = [
-            b'data: {"choices":[{"delta":{"content":""}}]}\n',
-            b'data: {"choices":[{"delta":{"content":"Content"}}]}\n',
-            b'data: [DONE]\n',
-        ]
-        mock_response.iter_lines.return_value = sse_data
-        mock_post.return_value = mock_response
+    @pytest.mark.parametrize("contents,expected_chunks", [
+        (["Response"], ["Response"]),
+        # Empty content should not trigger callback
+        (["", "Content"], ["Content"]),
+        (["Line 1\n", "Line 2\n", "Line 3"], ["Line 1\n", "Line 2\n", "Line 3"]),
+    ], ids=["single", "empty_content", "multiline"])
+    @patch('henzai.llm.requests.Session.post')
+    def test_streaming_collects_content(self, mock_post, llm_client, contents, expected_chunks):
+        """Test that deltas reach the callback and are joined into the result."""
+        mock_post.return_value = _sse_response(*contents)
         
         chunks = []
         result = llm_client._call_ramalama_api_streaming(
@@ -100,24 +176,18 @@ class TestLLMStreaming:
             lambda c: chunks.append(c)
         )
         
-        # Empty content should not trigger callback
-        assert result == "Content"
-        assert chunks == ["Content"]
+        assert result == "".join(contents)
+        assert chunks == expected_chunks
     
-    @patch('henzai.llm.requests.post')
+    @patch('henzai.llm.requests.Session.post')
     def test_streaming_handles_invalid_json(self, mock_post, llm_client):
         """Test that streaming gracefully handles invalid JSON chunks."""
-        mock_response = Mock()
-        mock_response.status_code = 200
-        
-        sse_data = [
-            b'data: {"choices":[{"delta":{"content":"Valid"}}]}\n',
+        mock_post.return_value = _sse_response(raw=[
+            _sse_line("Valid"),
             b'data: {invalid json}\n',  # Should be skipped
-            b'data: {"choices":[{"delta":{"content":" chunk"}}]}\n',
+            _sse_line(" chunk"),
             b'data: [DONE]\n',
-        ]
-        mock_response.iter_lines.return_value = sse_data
-        mock_post.return_value = mock_response
+        ])
         
         result = llm_client._call_ramalama_api_streaming(
             [{"role": "user", "content": "test"}],
@@ -126,46 +196,40 @@ class TestLLMStreaming:
         
         assert result == "Valid chunk"
     
-    @patch('henzai.llm.requests.post')
+    @patch('henzai.llm.requests.Session.post')
     def test_streaming_api_error(self, mock_post, llm_client):
         """Test handling of API errors during streaming."""
-        mock_response = Mock()
-        mock_response.status_code = 500
-        mock_post.return_value = mock_response
+        mock_post.return_value = _sse_response(status_code=500)
         
-        result = llm_client._call_ramalama_api_streaming(
-            [{"role": "user", "content": "test"}],
-            None
-        )
-        
-        assert "Error calling LLM" in result
-        assert "500" in result
+        with pytest.raises(Exception, match="API error 500"):
+            llm_client._call_ramalama_api_streaming(
+                [{"role": "user", "content": "test"}],
+                None
+            )
     
-    @patch('henzai.llm.requests.post')
+    @patch('henzai.llm.requests.Session.post')
     def test_streaming_connection_error(self, mock_post, llm_client):
         """Test handling of connection errors."""
         import requests
         mock_post.side_effect = requests.exceptions.ConnectionError()
         
-        result = llm_client._call_ramalama_api_streaming(
-            [{"role": "user", "content": "test"}],
-            None
-        )
-        
-        assert "Cannot connect to Ramalama" in result
+        with pytest.raises(Exception, match="Cannot connect to Ramalama"):
+            llm_client._call_ramalama_api_streaming(
+                [{"role": "user", "content": "test"}],
+                None
+            )
     
-    @patch('henzai.llm.requests.post')
+    @patch('henzai.llm.requests.Session.post')
     def test_streaming_timeout_error(self, mock_post, llm_client):
         """Test handling of timeout errors."""
         import requests
         mock_post.side_effect = requests.exceptions.Timeout()
         
-        result = llm_client._call_ramalama_api_streaming(
-            [{"role": "user", "content": "test"}],
-            None
-        )
-        
-        assert "timed out" in result
+        with pytest.raises(Exception, match="timed out"):
+            llm_client._call_ramalama_api_streaming(
+                [{"role": "user", "content": "test"}],
+                None
+            )
     
     def test_stop_generation_with_active_request(self, llm_client):
         """Test stopping generation with an active request."""
@@ -179,6 +243,48 @@ class TestLLMStreaming:
         mock_request.close.assert_called_once()
         assert llm_client._current_request is None
     
+    @patch('henzai.llm.requests.Session.post')
+    def test_stop_generation_breaks_streaming_loop(self, mock_post, llm_client):
+        """Test that stopping mid-stream ends the loop and keeps the partial response."""
+        mock_post.return_value = _sse_response("Hello", " world")
+        
+        chunks = []
+        
+        def chunk_callback(chunk):
+            chunks.append(chunk)
+            llm_client.stop_current_generation()
+        
+        result = llm_client._call_ramalama_api_streaming(
+            [{"role": "user", "content": "test"}],
+            chunk_callback
+        )
+        
+        assert result == "Hello"
+        assert chunks == ["Hello"]
+        assert llm_client._current_request is None
+    
+    @patch('henzai.llm.requests.Session.post')
+    def test_stop_before_request_skips_it(self, mock_post, llm_client):
+        """Test that a stop issued before the request starts is not discarded."""
+        llm_client.stop_current_generation()
+
+        result = llm_client._call_ramalama_api_streaming(
+            [{"role": "user", "content": "test"}]
+        )
+
+        assert result == ""
+        mock_post.assert_not_called()
+
+    @patch('henzai.llm.requests.Session.post')
+    def test_new_generation_clears_stop(self, mock_post, llm_client):
+        """Test that generate_response_streaming resets a previous stop."""
+        mock_post.return_value = _sse_response("Hi")
+        llm_client.stop_current_generation()
+
+        result = llm_client.generate_response_streaming("test", use_cache=False)
+
+        assert result == "Hi"
+
     def test_stop_generation_without_active_request(self, llm_client):
         """Test stopping generation when no request is active."""
         llm_client._current_request = None
@@ -203,18 +309,10 @@ class TestLLMStreaming:
         # Request should still be cleared even if close fails
         assert llm_client._current_request is None
     
-    @patch('henzai.llm.requests.post')
+    @patch('henzai.llm.requests.Session.post')
     def test_generate_response_streaming_integration(self, mock_post, llm_client):
         """Test the high-level generate_response_streaming method."""
-        mock_response = Mock()
-        mock_response.status_code = 200
-        
-        sse_data = [
-            b'data: {"choices":[{"delta":{"content":"Response"}}]}\n',
-            b'data: [DONE]\n',
-        ]
-        mock_response.iter_lines.return_value = sse_data
-        mock_post.return_value = mock_response
+        mock_post.return_value = _sse_response("Response")
         
         chunks = []
         result = llm_client.generate_response_streaming(
@@ -226,13 +324,74 @@ class TestLLMStreaming:
         assert result == "Response"
         assert chunks == ["Response"]
     
-    @patch('henzai.llm.requests.post')
+    @patch('henzai.llm.requests.Session.post')
+    def test_generate_response_streaming_replays_cached_response(self, mock_post, llm_client):
+        """Test that a repeated request is answered from the response cache."""
+        mock_post.return_value = _sse_response("Cached", " answer")
+        
+        first = llm_client.generate_response_streaming("Test message", context=[])
+        chunks = []
+        second = llm_client.generate_response_streaming(
+            "Test message",
+            context=[],
+            chunk_callback=lambda c: chunks.append(c)
+        )
+        
+        assert first == second == "Cached answer"
+        assert chunks == ["Cached answer"]
+        assert mock_post.call_count == 1
+        
+        # Different context is a different request
+        llm_client.generate_response_streaming(
+            "Test message",
+            context=[{'user': 'Hello', 'assistant': 'Hi'}]
+        )
+        assert mock_post.call_count == 2
+    
+    @patch('henzai.llm.requests.Session.post')
+    def test_response_cache_expires_and_can_be_bypassed(self, mock_post, llm_client):
+        """Test that cached responses expire and use_cache=False skips them."""
+        mock_post.return_value = _sse_response("Answer")
+        
+        llm_client.generate_response_streaming("Test message", context=[])
+        llm_client.generate_response_streaming("Test message", context=[], use_cache=False)
+        assert mock_post.call_count == 2
+        
+        with patch('henzai.llm.time.monotonic', return_value=time.monotonic() + llm_client._RESPONSE_CACHE_TTL):
+            llm_client.generate_response_streaming("Test message", context=[])
+        assert mock_post.call_count == 3
+    
+    @patch('henzai.llm.requests.Session.post')
+    def test_clear_response_cache_forces_fresh_reply(self, mock_post, llm_client):
+        """Test that a cleared cache asks the model again for the same request."""
+        mock_post.return_value = _sse_response("Answer")
+        
+        llm_client.generate_response_streaming("Test message", context=[])
+        llm_client.clear_response_cache()
+        llm_client.generate_response_streaming("Test message", context=[])
+        assert mock_post.call_count == 2
+    
+    @patch('henzai.llm.requests.Session.post')
+    def test_response_cache_skips_unrecorded_reasoning(self, mock_post, llm_client):
+        """Test that answers whose thinking was not recorded are not cached."""
+        mock_post.return_value = _sse_response("Answer")
+        llm_client.reasoning_enabled = True
+        
+        with patch.object(llm_client, 'supports_reasoning', return_value=True):
+            llm_client.generate_response_streaming("Test message", context=[])
+            llm_client.generate_response_streaming(
+                "Test message",
+                context=[],
+                reasoning_callback=lambda c: None
+            )
+        
+        assert mock_post.call_count == 2
+    
+    @patch('henzai.llm.requests.Session.post')
     def test_streaming_sets_current_request(self, mock_post, llm_client):
         """Test that streaming sets and clears _current_request."""
-        mock_response = Mock()
-        mock_response.status_code = 200
-        mock_response.iter_lines.return_value = [b'data: [DONE]\n']
-        mock_post.return_value = mock_response
+        response = _sse_response()
+        mock_post.return_value = response
         
         assert llm_client._current_request is None
         
@@ -241,38 +400,70 @@ class TestLLMStreaming:
             None
         )
         
-        # Should be cleared after completion
+        # Should be cleared (and the connection released) after completion
         assert llm_client._current_request is None
+        assert response.closed
     
-    @patch('henzai.llm.requests.post')
-    def test_streaming_multiline_response(self, mock_post, llm_client):
-        """Test streaming with newlines in content."""
-        mock_response = Mock()
-        mock_response.status_code = 200
+    @patch('henzai.llm.requests.Session.post')
+    def test_streaming_lines_split_across_chunks(self, mock_post, llm_client):
+        """Test that SSE lines split across network chunks are reassembled."""
+        mock_post.return_value = _sse_response(raw=[
+            b'data: {"choices":[{"delta":{"con',
+            b'tent":"Hel"}}]}\r\ndata: {"choices":[{"delta":{"content":"lo"}}]}\r',
+            b'\n\r\ndata: [DO',
+            b'NE]\n',
+        ])
+        
+        chunks = []
+        result = llm_client._call_ramalama_api_streaming(
+            [{"role": "user", "content": "test"}],
+            lambda c: chunks.append(c)
+        )
         
-        sse_data = [
-            b'data: {"choices":[{"delta":{"content":"Line 1\\n"}}]}\n',
-            b'data: {"choices":[{"delta":{"content":"Line 2\\n"}}]}\n',
-            b'data: {"choices":[{"delta":{"content":"Line 3"}}]}\n',
+        assert result == "Hello"
+        assert chunks == ["Hel", "lo"]
+    
+    @patch('henzai.llm.requests.Session.post')
+    def test_streaming_skips_keepalive_lines(self, mock_post, llm_client):
+        """Test that SSE comments and non-data fields are ignored."""
+        mock_post.return_value = _sse_response(raw=[
+            b': ping\n\n',
+            b'event: message\n',
+            _sse_line("Hi") + b'\n',
+            b': ping\n',
             b'data: [DONE]\n',
-        ]
-        mock_response.iter_lines.return_value = sse_data
-        mock_post.return_value = mock_response
+        ])
         
+        chunks = []
         result = llm_client._call_ramalama_api_streaming(
             [{"role": "user", "content": "test"}],
-            None
+            lambda c: chunks.append(c)
         )
         
-        assert result == "Line 1\nLine 2\nLine 3"
+        assert result == "Hi"
+        assert chunks == ["Hi"]
     
-    @patch('henzai.llm.requests.post')
+    @patch('henzai.llm.requests.Session.post')
+    def test_streaming_batches_chunks(self, mock_post, llm_client):
+        """Test that deltas are coalesced into growing batches."""
+        mock_post.return_value = _sse_response(*"0123456789")
+        
+        chunks = []
+        result = llm_client._call_ramalama_api_streaming(
+            [{"role": "user", "content": "test"}],
+            lambda c: chunks.append(c),
+            max_batch_size=9,
+            flush_interval=60
+        )
+        
+        assert result == "0123456789"
+        # First delta alone, then batches of 3 and 9; the tail is flushed at [DONE]
+        assert chunks == ["0", "123", "456789"]
+    
+    @patch('henzai.llm.requests.Session.post')
     def test_streaming_with_context(self, mock_post, llm_client):
         """Test streaming includes conversation context."""
-        mock_response = Mock()
-        mock_response.status_code = 200
-        mock_response.iter_lines.return_value = [b'data: [DONE]\n']
-        mock_post.return_value = mock_response
+        mock_post.return_value = _sse_response()
         
         context = [
             {'user': 'Hello', 'assistant': 'Hi there'},
@@ -287,11 +478,30 @@ class TestLLMStreaming:
         
         # Check that context was included in messages
         call_args = mock_post.call_args
-        payload = call_args[1]['json']
+        payload = json.loads(call_args[1]['data'])
         messages = payload['messages']
         
         # Should have system + context + current message
         assert len(messages) == 6  # system + 2*2 context + current
         assert messages[1]['content'] == 'Hello'
         assert messages[2]['content'] == 'Hi there'
+    
+    @patch('henzai.llm.requests.Session.post')
+    def test_streaming_context_is_trimmed_to_budget(self, mock_post, llm_client):
+        """Test that older turns are dropped once the context budget is used."""
+        mock_post.return_value = _sse_response()
+        
+        long_text = "x" * (llm_client._CONTEXT_CHAR_BUDGET // 2)
+        context = [
+            {'user': 'Oldest', 'assistant': 'Dropped'},
+            {'user': long_text, 'assistant': 'Over budget'},
+            {'user': long_text, 'assistant': 'Newest'},
+        ]
+        
+        llm_client.generate_response_streaming("New message", context=context)
+        
+        messages = json.loads(mock_post.call_args[1]['data'])['messages']
+        contents = [m['content'] for m in messages[1:-1]]
+        # Only the newest turn fits alongside the budget
+        assert contents == [long_text, 'Newest']
 
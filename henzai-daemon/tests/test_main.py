@@ -0,0 +1,105 @@
+"""
+Tests for ramalama.service parsing in the daemon entry point.
+"""
+
+from unittest.mock import Mock, patch
+
+from henzai import main
+from henzai.main import _parse_model_from_unit
+
+
+class TestParseModelFromUnit:
+    """Test extracting the served model from ExecStart lines."""
+
+    def test_parses_model_argument(self):
+        """Test that the last argument of `ramalama serve` is the model."""
+        unit = "[Service]\nExecStart=/usr/bin/ramalama serve --port 8080 ollama://library/llama3.2:latest\n"
+
+        assert _parse_model_from_unit(unit) == "ollama://library/llama3.2:latest"
+
+    def test_last_exec_start_wins(self):
+        """Test that a reset and reassignment override the first ExecStart."""
+        unit = (
+            "[Service]\n"
+            "ExecStart=/usr/bin/ramalama serve ollama://library/llama3.2:latest\n"
+            "ExecStart=\n"
+            "ExecStart=/usr/bin/ramalama serve ollama://library/deepseek-r1:14b\n"
+        )
+
+        assert _parse_model_from_unit(unit) == "ollama://library/deepseek-r1:14b"
+
+    def test_trailing_reset_clears_model(self):
+        """Test that a final empty ExecStart leaves no model."""
+        unit = "ExecStart=/usr/bin/ramalama serve llama3.2:latest\nExecStart=\n"
+
+        assert _parse_model_from_unit(unit) is None
+
+
+class TestDetectModel:
+    """Test locating ramalama.service, its drop-ins and the systemctl fallback."""
+
+    def _write(self, path, text):
+        """Create path (and its parent directories) with text."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+
+    def test_dropin_overrides_exec_start(self, tmp_path, monkeypatch):
+        """Test that a drop-in ExecStart replaces the unit's model."""
+        high, low = tmp_path / "config", tmp_path / "usr"
+        monkeypatch.setattr(main, "RAMALAMA_UNIT_DIRS", [str(high), str(low)])
+        monkeypatch.setattr(main, "MODEL_CACHE_PATH", str(tmp_path / "model.json"))
+        self._write(low / "ramalama.service", "[Service]\nExecStart=/usr/bin/ramalama serve llama3.2:latest\n")
+        self._write(high / "ramalama.service.d" / "model.conf",
+                    "[Service]\nExecStart=\nExecStart=/usr/bin/ramalama serve deepseek-r1:14b\n")
+
+        assert main._detect_model("default") == "deepseek-r1:14b"
+
+    def test_higher_priority_dropin_masks_same_name(self, tmp_path, monkeypatch):
+        """Test that a drop-in name in a higher-priority directory wins."""
+        high, low = tmp_path / "config", tmp_path / "usr"
+        monkeypatch.setattr(main, "RAMALAMA_UNIT_DIRS", [str(high), str(low)])
+        self._write(low / "ramalama.service", "")
+        self._write(low / "ramalama.service.d" / "a.conf", "")
+        self._write(high / "ramalama.service.d" / "a.conf", "")
+        self._write(low / "ramalama.service.d" / "b.conf", "")
+
+        assert main._find_ramalama_unit_files() == [
+            str(low / "ramalama.service"),
+            str(high / "ramalama.service.d" / "a.conf"),
+            str(low / "ramalama.service.d" / "b.conf"),
+        ]
+
+    def test_falls_back_to_systemctl_cat(self, tmp_path, monkeypatch):
+        """Test that systemd is asked when no unit file is on the search path."""
+        monkeypatch.setattr(main, "RAMALAMA_UNIT_DIRS", [str(tmp_path / "missing")])
+        result = Mock(returncode=0, stdout="ExecStart=/usr/bin/ramalama serve llama3.2:latest\n")
+
+        with patch("henzai.main.subprocess.run", return_value=result) as mock_run:
+            assert main._detect_model("default") == "llama3.2:latest"
+        assert mock_run.call_args[0][0] == ["systemctl", "--user", "cat", "ramalama.service"]
+
+
+class TestFinishInit:
+    """Test applying the startup probe results."""
+
+    def test_applies_probe_results(self):
+        """Test that the detected model and reasoning mode are applied."""
+        llm = Mock(model="default", reasoning_enabled=False)
+        service = Mock()
+
+        main._finish_init(service, llm, "default", "deepseek-r1:14b", True)
+
+        assert llm.model == "deepseek-r1:14b"
+        assert llm.reasoning_enabled is True
+        assert service.status == "ready"
+
+    def test_keeps_model_set_during_probe(self):
+        """Test that a SetModel made while probing is not undone."""
+        llm = Mock(model="llama3.2:latest", reasoning_enabled=False)
+        service = Mock()
+
+        main._finish_init(service, llm, "default", "deepseek-r1:14b", True)
+
+        assert llm.model == "llama3.2:latest"
+        assert llm.reasoning_enabled is False
+        assert service.status == "ready"
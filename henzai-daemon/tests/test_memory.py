@@ -0,0 +1,322 @@
+"""
+Tests for the SQLite memory store.
+"""
+
+import os
+import signal
+import sqlite3
+import subprocess
+import sys
+import threading
+
+import pytest
+from henzai.memory import MemoryStore, SCHEMA_VERSION
+
+
+@pytest.fixture
+def store(tmp_path):
+    """Memory store backed by a temporary database file."""
+    with MemoryStore(db_path=str(tmp_path / "memory.db")) as memory:
+        yield memory
+
+
+class TestMemoryStore:
+    """Test conversation and session storage."""
+
+    def test_uses_wal_journal(self, store):
+        """Test that the database is opened in WAL mode."""
+        mode = store.conn.execute("PRAGMA journal_mode").fetchone()[0]
+        assert mode == "wal"
+
+    def test_recent_context_is_chronological(self, store):
+        """Test that recent context is returned oldest first."""
+        for i in range(3):
+            store.add_conversation(f"q{i}", f"a{i}")
+
+        context = store.get_recent_context(limit=2)
+
+        assert context == [
+            {'user': 'q1', 'assistant': 'a1'},
+            {'user': 'q2', 'assistant': 'a2'},
+        ]
+
+    def test_recent_context_uses_session_index(self, store):
+        """Test that the per-session query needs no temporary sort."""
+        plan = store.conn.execute(
+            "EXPLAIN QUERY PLAN SELECT user_message FROM conversations "
+            "WHERE session_id = ? ORDER BY timestamp DESC, id DESC LIMIT 10", (1,)
+        ).fetchall()
+        details = " ".join(row[3] for row in plan)
+
+        assert "idx_conv_sess_ts" in details
+        assert "TEMP B-TREE" not in details
+
+    def test_delete_session_cascades_to_conversations(self, store):
+        """Test that deleting a session removes its conversations."""
+        store.add_conversation("hello", "hi")
+        session_id = store.current_session_id
+
+        store.delete_session(session_id)
+
+        count = store.conn.execute(
+            "SELECT COUNT(*) FROM conversations WHERE session_id = ?", (session_id,)
+        ).fetchone()[0]
+        assert count == 0
+        assert store.current_session_id != session_id
+
+    def test_added_turn_is_visible_to_reads(self, store):
+        """Test that a stored conversation turn is immediately readable."""
+        store.add_conversation("hello", "hi")
+
+        assert store.get_recent_context() == [{'user': 'hello', 'assistant': 'hi'}]
+
+    def test_turn_survives_sigterm(self, tmp_path):
+        """Test that a stored turn is on disk even if the process is killed."""
+        db_path = str(tmp_path / "memory.db")
+        script = (
+            "from henzai.memory import MemoryStore\n"
+            f"memory = MemoryStore(db_path={db_path!r})\n"
+            "memory.add_conversation('hello', 'hi')\n"
+            "print('stored', flush=True)\n"
+            "import time; time.sleep(60)\n"
+        )
+        proc = subprocess.Popen(
+            [sys.executable, "-c", script],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            stdout=subprocess.PIPE, text=True
+        )
+        try:
+            assert proc.stdout.readline().strip() == "stored"
+            proc.send_signal(signal.SIGTERM)
+            proc.wait(timeout=10)
+        finally:
+            proc.kill()
+            proc.stdout.close()
+
+        conn = sqlite3.connect(db_path)
+        try:
+            assert conn.execute("SELECT COUNT(*) FROM conversations").fetchone()[0] == 1
+        finally:
+            conn.close()
+
+    def test_settings_round_trip(self, store):
+        """Test that settings are stored and overwritten by key."""
+        store.set_setting("theme", "dark")
+        store.set_setting("theme", "light")
+
+        assert store.get_setting("theme") == "light"
+        assert store.get_setting("missing", "default") == "default"
+
+    def test_legacy_settings_table_is_migrated(self, tmp_path):
+        """Test that a rowid settings table is rebuilt WITHOUT ROWID."""
+        db_path = str(tmp_path / "memory.db")
+        conn = sqlite3.connect(db_path)
+        conn.execute(
+            "CREATE TABLE settings (key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "updated_at DATETIME DEFAULT CURRENT_TIMESTAMP)"
+        )
+        conn.execute("INSERT INTO settings (key, value) VALUES ('theme', 'dark')")
+        conn.commit()
+        conn.close()
+
+        memory = MemoryStore(db_path=db_path)
+        try:
+            sql = memory.conn.execute(
+                "SELECT sql FROM sqlite_master WHERE name = 'settings'"
+            ).fetchone()[0]
+            assert "WITHOUT ROWID" in sql
+            assert memory.get_setting("theme") == "dark"
+        finally:
+            memory.close()
+
+    def test_message_count_tracks_conversations(self, store):
+        """Test that sessions report their turn count without a save."""
+        store.add_conversation("first question", "answer")
+        store.add_conversation("second question", "answer")
+
+        sessions = store.list_sessions()
+
+        assert len(sessions) == 1
+        assert sessions[0]['id'] == store.current_session_id
+        assert sessions[0]['message_count'] == 2
+
+    def test_save_session_titles_from_first_message(self, store):
+        """Test that the auto-title is the truncated first user message."""
+        store.add_conversation("x" * 60, "answer")
+        store.save_current_session()
+
+        assert store.list_sessions()[0]['title'] == "x" * 50 + "..."
+
+    def test_iter_all_conversations_spans_batches(self, store):
+        """Test that iteration yields every row across fetch batches."""
+        for i in range(5):
+            store.add_conversation(f"q{i}", f"a{i}")
+
+        messages = [c['user_message'] for c in store.iter_all_conversations(batch_size=2)]
+
+        assert sorted(messages) == [f"q{i}" for i in range(5)]
+
+    def test_action_history_round_trip(self, store):
+        """Test that logged action parameters are decoded on read."""
+        store.log_action("launch_app", {"app": "firefox"}, "launched", True)
+
+        action = store.get_action_history(limit=1)[0]
+
+        assert action['action_type'] == "launch_app"
+        assert action['parameters'] == {"app": "firefox"}
+        assert action['success'] is True
+
+    def test_large_action_parameters_are_compressed(self, store):
+        """Test that large JSON payloads are stored compressed and decoded."""
+        parameters = {"command": "echo " + "x" * 4096}
+        store.log_action("execute_command", parameters, "done", True)
+
+        raw = store.conn.execute("SELECT parameters FROM action_history").fetchone()[0]
+
+        assert isinstance(raw, bytes)
+        assert len(raw) < 4096
+        assert store.get_action_history(limit=1)[0]['parameters'] == parameters
+
+    def test_session_row_created_on_first_turn(self, store):
+        """Test that no session is written until a turn is stored."""
+        assert store.current_session_id is None
+        assert store.conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0] == 0
+
+        store.add_conversation("hello", "hi")
+        store.clear_history()
+        store.add_conversation("again", "hi")
+
+        assert store.conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0] == 2
+
+    def test_threads_get_their_own_connection(self, store):
+        """Test that each thread reads through its own connection."""
+        store.add_conversation("hello", "hi")
+        seen = {}
+
+        def worker():
+            seen['conn'] = store.conn
+            seen['context'] = store.get_recent_context()
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+
+        assert seen['conn'] is not store.conn
+        assert seen['context'] == [{'user': 'hello', 'assistant': 'hi'}]
+
+    def test_connections_of_exited_threads_are_closed(self, store):
+        """Test that a new connection prunes those of finished threads."""
+        thread = threading.Thread(target=lambda: store.conn)
+        thread.start()
+        thread.join()
+
+        other = threading.Thread(target=lambda: store.conn)
+        other.start()
+        other.join()
+
+        assert thread not in store._connections
+
+    def test_save_session_keeps_explicit_title(self, store):
+        """Test that a given title overrides the auto-generated one."""
+        store.add_conversation("short question", "answer")
+        store.save_current_session("My chat")
+
+        assert store.list_sessions()[0]['title'] == "My chat"
+
+    def test_schema_version_is_recorded(self, store):
+        """Test that initialization stamps the schema version."""
+        version = store.conn.execute("PRAGMA user_version").fetchone()[0]
+
+        assert version == SCHEMA_VERSION
+
+    def test_uses_incremental_auto_vacuum(self, store):
+        """Test that a new database is created with auto_vacuum=INCREMENTAL."""
+        mode = store.conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+
+        assert mode == 2
+
+    def test_existing_database_is_switched_to_incremental_vacuum(self, tmp_path):
+        """Test that an older database without auto_vacuum is rebuilt once."""
+        db_path = str(tmp_path / "memory.db")
+        conn = sqlite3.connect(db_path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE unrelated (id INTEGER PRIMARY KEY)")
+        conn.commit()
+        conn.close()
+
+        with MemoryStore(db_path=db_path) as store:
+            mode = store.conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+
+        assert mode == 2
+
+    def test_legacy_text_timestamps_are_migrated(self, tmp_path):
+        """Test that pre-integer-timestamp tables are converted in place."""
+        db_path = str(tmp_path / "memory.db")
+        conn = sqlite3.connect(db_path)
+        conn.executescript("""
+            CREATE TABLE sessions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                message_count INTEGER DEFAULT 0
+            );
+            CREATE TABLE conversations (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, session_id INTEGER,
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                user_message TEXT NOT NULL, assistant_response TEXT NOT NULL,
+                context_json TEXT,
+                FOREIGN KEY (session_id) REFERENCES sessions (id) ON DELETE CASCADE
+            );
+            INSERT INTO sessions (id, title, created_at, updated_at, message_count)
+                VALUES (7, 'Old chat', '2024-01-02 03:04:05', '2024-01-02 03:04:05', 0);
+            INSERT INTO conversations (session_id, timestamp, user_message, assistant_response)
+                VALUES (7, '2024-01-02 03:04:05', 'hello', 'hi');
+        """)
+        conn.close()
+
+        memory = MemoryStore(db_path=db_path)
+        try:
+            session = memory.list_sessions()[0]
+            assert session['id'] == 7
+            assert session['created_at'] == '2024-01-02 03:04:05'
+            assert session['message_count'] == 1
+            conversation = memory.get_all_conversations()[0]
+            assert conversation['timestamp'] == '2024-01-02 03:04:05'
+            assert memory.load_session(7) == [{'user': 'hello', 'assistant': 'hi'}]
+            assert memory.conn.execute(
+                "SELECT typeof(timestamp) FROM conversations"
+            ).fetchone()[0] == 'integer'
+        finally:
+            memory.close()
+
+    def test_close_is_idempotent(self, store):
+        """Test that closing twice is harmless."""
+        store.add_conversation("hello", "hi")
+
+        store.close()
+        store.close()
+
+        assert store._connections == {}
+
+    def test_maintenance_truncates_wal(self, store, tmp_path):
+        """Test that maintenance checkpoints the WAL back to empty."""
+        for i in range(50):
+            store.add_conversation(f"q{i}", "a" * 1000)
+        store.get_recent_context()
+
+        store.maintenance()
+
+        assert (tmp_path / "memory.db-wal").stat().st_size == 0
+
+    def test_clear_history_saves_session(self, store):
+        """Test that clearing keeps stored turns and titles the session."""
+        store.add_conversation("what time is it", "noon")
+        session_id = store.current_session_id
+
+        store.clear_history()
+
+        session = store.list_sessions()[0]
+        assert session['id'] == session_id
+        assert session['title'] == "what time is it"
+        assert session['message_count'] == 1
+        assert store.current_session_id is None
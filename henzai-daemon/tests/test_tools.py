@@ -0,0 +1,55 @@
+"""
+Tests for the command allowlist in the tools module.
+"""
+
+import pytest
+
+pytest.importorskip("gi")
+
+from henzai.tools import _check_subcommand
+
+
+class TestCommandAllowlist:
+    """Test subcommand restrictions for programs that can change state."""
+
+    @pytest.mark.parametrize("command", [
+        "systemctl status ramalama",
+        "systemctl --user status ramalama",
+        "systemctl --user --no-pager list-units",
+        "gio info /tmp",
+        "gnome-extensions list",
+        "nmcli device status",
+        "nmcli -t connection show",
+        "nmcli device wifi list",
+        "uptime",
+    ])
+    def test_allows_read_only_subcommands(self, command):
+        """Test that read-only subcommands pass."""
+        _check_subcommand(command.split())
+
+    @pytest.mark.parametrize("command", [
+        "systemctl poweroff",
+        "systemctl --user restart ramalama",
+        "gio remove /tmp/file",
+        "gnome-extensions uninstall foo@bar",
+        "nmcli networking off",
+        "nmcli connection delete home",
+        "nmcli radio wifi off",
+        "nmcli general hostname evil",
+        "systemctl",
+    ])
+    def test_rejects_state_changing_subcommands(self, command):
+        """Test that destructive or missing subcommands are rejected."""
+        with pytest.raises(Exception, match="not allowed"):
+            _check_subcommand(command.split())
+
+    @pytest.mark.parametrize("command", [
+        "systemctl -p status poweroff",
+        "systemctl --property list-units reboot",
+        "systemctl -H status reboot",
+        "nmcli -f status networking off",
+    ])
+    def test_rejects_option_value_in_subcommand_slot(self, command):
+        """Test that an option's value can't pose as the subcommand."""
+        with pytest.raises(Exception, match="not allowed"):
+            _check_subcommand(command.split())
@@ -17,6 +17,10 @@ const henzaiInterface = `
             <arg type="s" direction="in" name="message"/>
             <arg type="s" direction="out" name="generation_id"/>
         </method>
+        <method name="RegenerateStreaming">
+            <arg type="s" direction="in" name="message"/>
+            <arg type="s" direction="out" name="generation_id"/>
+        </method>
         <method name="StopGeneration">
             <arg type="b" direction="out" name="success"/>
         </method>
@@ -162,9 +166,10 @@ export class DaemonClient {
      * Send a message with streaming response
      * @param {string} message - User's message
      * @param {function} onChunk - Callback for each chunk
+     * @param {boolean} regenerate - Ask for a fresh reply instead of a cached one
      * @returns {Promise<string>} Generation ID
      */
-    async sendMessageStreaming(message, onChunk) {
+    async sendMessageStreaming(message, onChunk, regenerate = false) {
         if (!this.isConnected()) {
             throw new Error('Not connected to henzai daemon. Is it running?');
         }
@@ -194,7 +199,7 @@ export class DaemonClient {
             // The method returns generation ID immediately, chunks arrive via signals
             const result = await new Promise((resolve, reject) => {
                 this._proxy.call(
-                    'SendMessageStreaming',
+                    regenerate ? 'RegenerateStreaming' : 'SendMessageStreaming',
                     new GLib.Variant('(s)', [message]),
                     Gio.DBusCallFlags.NONE,
                     -1,  // timeout in milliseconds, -1 = no timeout
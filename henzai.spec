@@ -14,6 +14,8 @@ Requires:       python3
 Requires:       python3-requests
 Requires:       python3-dasbus
 Requires:       python3-gobject
+# Faster JSON decoding for streamed responses (optional)
+Recommends:     python3-orjson
 
 # GNOME Shell for the extension
 Requires:       gnome-shell >= 45
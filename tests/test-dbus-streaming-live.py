@@ -8,6 +8,10 @@ import sys
 import time
 from dasbus.connection import SessionMessageBus
 from dasbus.loop import EventLoop
+from gi.repository import GLib
+
+# Seconds without any chunk before the stream is reported as stalled
+STALL_TIMEOUT = 60
 
 def test_long_streaming():
     """Test streaming with a query that takes 30+ seconds."""
@@ -29,17 +33,29 @@ def test_long_streaming():
         # Track chunks
         chunks_received = []
         thinking_chunks_received = []
-        last_chunk_time = None
+        stall_source_id = 0
+        
+        # Stall detector: one timeout, re-armed by every chunk, so an
+        # active stream never wakes the loop just to check on it
+        def on_stall():
+            nonlocal stall_source_id
+            stall_source_id = 0
+            print(f"\n⚠️  No chunks for {STALL_TIMEOUT}s, stream may be stalled")
+            return False
+        
+        def reset_stall_timer():
+            nonlocal stall_source_id
+            if stall_source_id:
+                GLib.source_remove(stall_source_id)
+            stall_source_id = GLib.timeout_add_seconds(STALL_TIMEOUT, on_stall)
         
         def on_response_chunk(chunk):
-            nonlocal last_chunk_time
-            last_chunk_time = time.time()
+            reset_stall_timer()
             chunks_received.append(chunk)
             print(f"📦 Response chunk #{len(chunks_received)}: {chunk[:30]}..." if len(chunk) > 30 else f"📦 Response chunk #{len(chunks_received)}: {chunk}")
         
         def on_thinking_chunk(chunk):
-            nonlocal last_chunk_time
-            last_chunk_time = time.time()
+            reset_stall_timer()
             thinking_chunks_received.append(chunk)
             print(f"🧠 Thinking chunk #{len(thinking_chunks_received)}: {chunk[:30]}..." if len(chunk) > 30 else f"🧠 Thinking chunk #{len(thinking_chunks_received)}: {chunk}")
         
@@ -53,7 +69,6 @@ def test_long_streaming():
         print("\n" + "-" * 70)
         
         start_time = time.time()
-        last_chunk_time = start_time
         
         # Create event loop to keep receiving signals
         loop = EventLoop()
@@ -101,16 +116,8 @@ def test_long_streaming():
         thread.daemon = True
         thread.start()
         
-        # Monitor for stalled stream
-        def check_activity():
-            if last_chunk_time and (time.time() - last_chunk_time) > 60:
-                print(f"\n⚠️  No chunks for 60s, stream may be stalled")
-                print(f"   Last chunk at: {time.time() - last_chunk_time:.1f}s ago")
-            return True
-        
-        # Check every 5 seconds
-        from gi.repository import GLib
-        GLib.timeout_add_seconds(5, check_activity)
+        # Monitor for stalled stream (also covers no first chunk at all)
+        reset_stall_timer()
         
         # Run event loop (will process signals)
         print("   Listening for chunks...\n")